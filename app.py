@@ -5,16 +5,43 @@ Autor: Replit Agent
 Data: 2025-10-27
 """
 
+import time
+
+# Początek pomiaru czasu startu (raport: /api/debug/startup)
+STARTUP_T0 = time.perf_counter()
+
 import os
+import re
+import sys
+import csv
 import json
 import sqlite3
 import secrets
+import shutil
+import mimetypes
+import functools
+import subprocess
+import threading
+import marshal
+import cProfile
+import pstats
+import io
+import gzip
+import hashlib
+from contextlib import contextmanager
 from datetime import datetime
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from urllib.parse import quote
+from flask import (Flask, Response, g, render_template, request, jsonify, session, redirect, url_for,
+                   has_request_context, before_render_template, template_rendered)
+from markupsafe import Markup, escape
 from werkzeug.utils import secure_filename
-import pandas as pd
 from waitress import serve
 
+from dataset import COLUMNS, SharedDataset, build_overview, dense_series, file_signature, iter_export_blocks
+from export_reader import MAX_VALUE, ExportError, cell_text, empty_columns, is_storable, new_report, read_export
+from singleflight import VersionedCache, get_stats as get_cache_stats
+import metrics
+
 # Konfiguracja aplikacji Flask
 app = Flask(__name__)
 
@@ -29,16 +56,139 @@ else:
     print("⚠️  W produkcji ustaw zmienną środowiskową SESSION_SECRET")
     print("⚠️  Przykład: export SESSION_SECRET=$(python -c 'import secrets; print(secrets.token_hex(32))')")
 app.config['UPLOAD_FOLDER'] = 'static/images'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # Max 16MB upload
+# Max rozmiar uploadu - Export.xlsx czytany jest strumieniowo, więc duże pliki nie zwiększają
+# szczytowego zużycia pamięci (zmienna KIOSK_MAX_UPLOAD_MB, domyślnie 64 MB)
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('KIOSK_MAX_UPLOAD_MB', 64)) * 1024 * 1024
 
 # Dozwolone rozszerzenia plików
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'svg', 'webp'}
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'svg', 'webp'}
+# Krótkie klipy w pokazie slajdów - serwowane z obsługą Range (206), bez wczytywania do pamięci
+VIDEO_EXTENSIONS = {'mp4', 'webm'}
+ALLOWED_EXTENSIONS = IMAGE_EXTENSIONS | VIDEO_EXTENSIONS
+# Windows nie zawsze zna typy wideo - bez tego przeglądarka dostałaby application/octet-stream
+mimetypes.add_type('video/mp4', '.mp4')
+mimetypes.add_type('video/webm', '.webm')
+# Klatka podglądu wideo: <nazwa>.poster.jpg obok klipu (wgrana z klipem lub z ffmpeg, jeśli jest w PATH)
+POSTER_SUFFIX = '.poster'
+POSTER_SECOND = 1
+
+# Baza danych SQLite
+DB_FILE = 'kiosk.db'
+
+# Plik z danymi produkcyjnymi i katalog współdzielonego snapshotu
+EXPORT_FILE = 'Export.xlsx'
+SNAPSHOT_DIR = os.path.join('cache', 'dataset')
+
+# Katalog metryk procesów roboczych (agregowanych przez /metrics)
+METRICS_DIR = os.path.join('cache', 'metrics')
+
+# ==================== METRYKI ====================
+
+HTTP_REQUESTS = metrics.Counter('kiosk_http_requests_total', 'Liczba żądań HTTP',
+                                ['route', 'method', 'status'])
+HTTP_LATENCY = metrics.Histogram('kiosk_http_request_duration_seconds', 'Czas obsługi żądania HTTP',
+                                 ['route'])
+HTTP_RESPONSE_SIZE = metrics.Histogram('kiosk_http_response_size_bytes', 'Rozmiar odpowiedzi HTTP',
+                                       ['route'], buckets=metrics.SIZE_BUCKETS)
+HTTP_IN_FLIGHT = metrics.Gauge('kiosk_http_requests_in_flight', 'Żądania HTTP w trakcie obsługi')
+SERVER_THREADS = metrics.Gauge('kiosk_server_threads', 'Liczba wątków roboczych serwera (Waitress)')
+EXCEL_PARSE_SECONDS = metrics.Histogram('kiosk_excel_parse_duration_seconds', 'Czas parsowania Export.xlsx',
+                                        buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60))
+EXCEL_PARSES = metrics.Counter('kiosk_excel_parses_total', 'Liczba parsowań Export.xlsx')
+EXCEL_REJECTS = metrics.Counter('kiosk_excel_rejects_total', 'Liczba plików Export.xlsx odrzuconych przez walidację')
+EXCEL_ROWS = metrics.Gauge('kiosk_excel_rows', 'Liczba wierszy formy długiej z ostatniego parsowania')
+SQLITE_SECONDS = metrics.Histogram('kiosk_sqlite_query_duration_seconds', 'Czas zapytań SQLite', ['query'],
+                                   buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1))
+CACHE_HITS = metrics.Counter('kiosk_cache_hits_total', 'Trafienia cache', ['cache'])
+CACHE_MISSES = metrics.Counter('kiosk_cache_misses_total', 'Chybienia cache', ['cache'])
+SINGLEFLIGHT_COALESCED = metrics.Counter('kiosk_singleflight_coalesced_total',
+                                         'Żądania dołączone do trwającego obliczenia', ['group'])
+DATASET_VERSION = metrics.Gauge('kiosk_dataset_version', 'Wersja załadowanego snapshotu danych')
+
+@metrics.register_collector
+def collect_cache_metrics():
+    """Przepisz liczniki cache i single-flight do metryk"""
+    stats = get_cache_stats()
+    for name, cache in stats['caches'].items():
+        CACHE_HITS.set_total(cache['hits'], cache=name)
+        CACHE_MISSES.set_total(cache['misses'], cache=name)
+    for name, flight in stats['flights'].items():
+        SINGLEFLIGHT_COALESCED.set_total(flight['coalesced'], group=name)
+    if dataset.loaded_version is not None:
+        DATASET_VERSION.set(dataset.loaded_version)
+
+# ==================== SERVER-TIMING I PROFILER ====================
+
+# Liczba funkcji w raporcie ?profile=1 i dozwolone klucze sortowania (?sort=)
+PROFILE_LIMIT = 40
+PROFILE_SORT_KEYS = ('cumulative', 'tottime', 'calls', 'ncalls', 'filename')
+# W procesie może działać tylko jeden cProfile
+profile_lock = threading.Lock()
+
+def add_timing(name, seconds):
+    """Dodaj czas do odcinka Server-Timing bieżącego żądania"""
+    if has_request_context():
+        spans = g.setdefault('server_timing', {})
+        spans[name] = spans.get(name, 0) + seconds
+
+@contextmanager
+def server_timing(name):
+    """Odcinek czasu żądania raportowany w nagłówku Server-Timing"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_timing(name, time.perf_counter() - start)
+
+@before_render_template.connect_via(app)
+def start_render_timing(sender, template, context, **extra):
+    g.render_started = time.perf_counter()
+
+@template_rendered.connect_via(app)
+def finish_render_timing(sender, template, context, **extra):
+    started = g.pop('render_started', None)
+    if started is not None:
+        add_timing('render', time.perf_counter() - started)
+
+def timed_query(name):
+    """Dekorator mierzący czas zapytania SQLite"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with SQLITE_SECONDS.time(query=name), server_timing('sqlite'):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# Czasy faz uruchamiania w ms od STARTUP_T0
+startup_timings = {}
+
+def mark_startup(phase):
+    """Zapisz czas fazy uruchamiania (tylko pierwsze wystąpienie)"""
+    if phase not in startup_timings:
+        startup_timings[phase] = round((time.perf_counter() - STARTUP_T0) * 1000, 1)
+
+def get_startup_report():
+    """Raport czasu startu i załadowanych ciężkich bibliotek"""
+    return {
+        'pid': os.getpid(),
+        'timings_ms': dict(startup_timings),
+        'heavy_modules': {name: name in sys.modules for name in ['numpy', 'pandas', 'openpyxl', 'plotly']}
+    }
+
+def print_startup_report():
+    """Wypisz raport czasu startu na konsolę"""
+    report = get_startup_report()
+    phases = ', '.join(f"{phase}: {ms} ms" for phase, ms in report['timings_ms'].items())
+    loaded = ', '.join(name for name, on in report['heavy_modules'].items() if on) or 'brak'
+    print(f"⏱️  Start: {phases}")
+    print(f"📦 Załadowane biblioteki: {loaded}")
 
 # ==================== BAZA DANYCH ====================
 
 def init_db():
     """Inicjalizacja bazy danych SQLite"""
-    conn = sqlite3.connect('kiosk.db')
+    conn = sqlite3.connect(DB_FILE)
     c = conn.cursor()
     
     # Tabela z ustawieniami ogólnymi
@@ -53,6 +203,9 @@ def init_db():
                   image_url TEXT,
                   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
     
+    # Indeks pełnotekstowy inspiracji (FTS5) synchronizowany triggerami
+    init_inspirations_fts(c)
+    
     # Tabela ze zdjęciami (dla pokazu slajdów)
     c.execute('''CREATE TABLE IF NOT EXISTS slides
                  (id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -82,26 +235,130 @@ def init_db():
     conn.commit()
     conn.close()
 
-def get_setting(key):
-    """Pobierz ustawienie z bazy danych"""
-    conn = sqlite3.connect('kiosk.db')
+# Indeks FTS5 inspiracji (tytuł, opis) - zewnętrzna treść z tabeli inspirations.
+# remove_diacritics: "zrod" znajduje "Źródła" (ł nie jest znakiem diakrytycznym w unicode61)
+INSPIRATIONS_FTS_SCHEMA = '''CREATE VIRTUAL TABLE inspirations_fts USING fts5(
+                 title, description, content='inspirations', content_rowid='id',
+                 tokenize='unicode61 remove_diacritics 2')'''
+INSPIRATIONS_FTS_TRIGGERS = [
+    '''CREATE TRIGGER IF NOT EXISTS inspirations_fts_insert AFTER INSERT ON inspirations BEGIN
+         INSERT INTO inspirations_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS inspirations_fts_delete AFTER DELETE ON inspirations BEGIN
+         INSERT INTO inspirations_fts(inspirations_fts, rowid, title, description)
+         VALUES ('delete', old.id, old.title, old.description);
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS inspirations_fts_update AFTER UPDATE ON inspirations BEGIN
+         INSERT INTO inspirations_fts(inspirations_fts, rowid, title, description)
+         VALUES ('delete', old.id, old.title, old.description);
+         INSERT INTO inspirations_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+       END''',
+]
+# Waga tytułu w rankingu bm25 względem opisu
+INSPIRATIONS_TITLE_WEIGHT = 5.0
+INSPIRATIONS_PAGE_SIZE = 20
+INSPIRATIONS_MAX_PAGE_SIZE = 100
+
+# Python bez FTS5 w SQLite - wyszukiwanie przez LIKE (wolniejsze, bez rankingu)
+fts_available = True
+
+def init_inspirations_fts(c):
+    """Utwórz indeks FTS5 i triggery; istniejące inspiracje indeksowane przy pierwszym utworzeniu"""
+    global fts_available
+    c.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='inspirations_fts'")
+    if c.fetchone() is None:
+        try:
+            c.execute(INSPIRATIONS_FTS_SCHEMA)
+        except sqlite3.OperationalError as e:
+            fts_available = False
+            print(f"⚠️  SQLite bez FTS5 ({e}) - wyszukiwanie inspiracji przez LIKE")
+            return
+        c.execute("INSERT INTO inspirations_fts(inspirations_fts) VALUES ('rebuild')")
+    for trigger in INSPIRATIONS_FTS_TRIGGERS:
+        c.execute(trigger)
+
+def fts_match_query(text):
+    """Zapytanie MATCH z tekstu użytkownika: każde słowo jako prefiks, wszystkie wymagane"""
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', text))
+
+@timed_query('inspirations_search')
+def search_inspirations(text, page=1, per_page=INSPIRATIONS_PAGE_SIZE):
+    """
+    Szukaj inspiracji po tytule i opisie (ranking bm25, tytuł ważniejszy).
+    Pusty tekst - najnowsze inspiracje. Zwraca (wyniki strony, liczba wszystkich trafień).
+    """
+    offset = (page - 1) * per_page
+    conn = sqlite3.connect(DB_FILE)
     c = conn.cursor()
-    c.execute("SELECT value FROM settings WHERE key=?", (key,))
-    result = c.fetchone()
+    words = re.findall(r'\w+', text)
+    if not words:
+        c.execute("SELECT COUNT(*) FROM inspirations")
+        total = c.fetchone()[0]
+        c.execute("SELECT id, title, description, image_url FROM inspirations ORDER BY id DESC LIMIT ? OFFSET ?",
+                  (per_page, offset))
+    elif fts_available:
+        match = fts_match_query(text)
+        c.execute("SELECT COUNT(*) FROM inspirations_fts WHERE inspirations_fts MATCH ?", (match,))
+        total = c.fetchone()[0]
+        c.execute('''SELECT i.id, i.title, i.description, i.image_url
+                     FROM inspirations_fts JOIN inspirations i ON i.id = inspirations_fts.rowid
+                     WHERE inspirations_fts MATCH ?
+                     ORDER BY bm25(inspirations_fts, ?, 1.0) LIMIT ? OFFSET ?''',
+                  (match, INSPIRATIONS_TITLE_WEIGHT, per_page, offset))
+    else:
+        where = ' AND '.join(['(title LIKE ? OR description LIKE ?)'] * len(words))
+        params = [f'%{word}%' for word in words for _ in range(2)]
+        c.execute(f"SELECT COUNT(*) FROM inspirations WHERE {where}", params)
+        total = c.fetchone()[0]
+        c.execute(f"SELECT id, title, description, image_url FROM inspirations WHERE {where} "
+                  f"ORDER BY id DESC LIMIT ? OFFSET ?", params + [per_page, offset])
+    results = [{'id': row[0], 'title': row[1], 'description': row[2], 'image_url': row[3]}
+               for row in c.fetchall()]
     conn.close()
-    return result[0] if result else None
+    return results, total
+
+# Cache odczytów z bazy - ważny dopóki plik bazy się nie zmieni (zapis w dowolnym procesie)
+_db_cache = {'signature': None}
+
+def _db_cached(name, load):
+    """Zwróć wynik load() z cache unieważnianego zmianą pliku kiosk.db"""
+    signature = file_signature(DB_FILE)
+    if signature != _db_cache['signature']:
+        _db_cache.clear()
+        _db_cache['signature'] = signature
+    if name not in _db_cache:
+        _db_cache[name] = load()
+    return _db_cache[name]
+
+@timed_query('settings_select')
+def _load_settings():
+    conn = sqlite3.connect(DB_FILE)
+    c = conn.cursor()
+    c.execute("SELECT key, value FROM settings")
+    settings = dict(c.fetchall())
+    conn.close()
+    return settings
+
+def get_settings():
+    """Pobierz wszystkie ustawienia z bazy danych (cache)"""
+    return _db_cached('settings', _load_settings)
 
+def get_setting(key):
+    """Pobierz ustawienie z bazy danych"""
+    return get_settings().get(key)
+
+@timed_query('settings_update')
 def update_setting(key, value):
     """Aktualizuj ustawienie w bazie danych"""
-    conn = sqlite3.connect('kiosk.db')
+    conn = sqlite3.connect(DB_FILE)
     c = conn.cursor()
     c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value))
     conn.commit()
     conn.close()
 
-def get_inspirations():
-    """Pobierz wszystkie inspiracje"""
-    conn = sqlite3.connect('kiosk.db')
+@timed_query('inspirations_select')
+def _load_inspirations():
+    conn = sqlite3.connect(DB_FILE)
     c = conn.cursor()
     c.execute("SELECT id, title, description, image_url FROM inspirations ORDER BY created_at DESC")
     inspirations = [{'id': row[0], 'title': row[1], 'description': row[2], 'image_url': row[3]} 
@@ -109,191 +366,522 @@ def get_inspirations():
     conn.close()
     return inspirations
 
+def get_inspirations():
+    """Pobierz wszystkie inspiracje (cache)"""
+    return _db_cached('inspirations', _load_inspirations)
+
 # ==================== POMOCNICZE FUNKCJE ====================
 
 def allowed_file(filename):
     """Sprawdź czy plik ma dozwolone rozszerzenie"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def is_video(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in VIDEO_EXTENSIONS
+
+CONFIG_FILE = 'config.json'
+# Konfiguracja domyślna (brak pliku lub brak klucza w pliku)
+DEFAULT_CONFIG = {'admin_pin': '7456', 'rotation_interval': 30, 'refresh_interval': 300}
+# Klucze config.json, których nie wysyłamy do przeglądarek (/api/config)
+PRIVATE_CONFIG_KEYS = ('admin_pin', 'server')
+
+# Konfiguracja w pamięci - wczytywana ponownie tylko gdy config.json się zmieni
+_config_cache = {'signature': None, 'config': dict(DEFAULT_CONFIG)}
+
 def load_config():
-    """Wczytaj konfigurację z pliku config.json"""
+    """Wczytaj konfigurację z pliku config.json (cache do zmiany pliku - tylko do odczytu)"""
+    signature = file_signature(CONFIG_FILE)
+    if signature == _config_cache['signature']:
+        return _config_cache['config']
+    
+    config = dict(DEFAULT_CONFIG)
     try:
-        with open('config.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
+        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+            config.update(json.load(f))
     except FileNotFoundError:
-        # Zwróć domyślną konfigurację jeśli plik nie istnieje
-        return {'admin_pin': '7456', 'rotation_interval': 30, 'refresh_interval': 300}
+        pass
+    except ValueError as e:
+        # Plik w trakcie edycji lub z błędem - zostaw poprzednią konfigurację do następnej zmiany pliku
+        print(f"⚠️  Błąd w {CONFIG_FILE}: {e} - używam poprzedniej konfiguracji")
+        config = _config_cache['config']
+    _config_cache['config'] = config
+    _config_cache['signature'] = signature
+    return config
+
+def get_public_config():
+    """Konfiguracja dla przeglądarek (interwały, nazwa, motyw) - bez PINu i ustawień serwera"""
+    return {key: value for key, value in load_config().items() if key not in PRIVATE_CONFIG_KEYS}
+
+def get_server_settings():
+    """Ustawienia serwera: sekcja "server" z config.json, nadpisywana zmiennymi KIOSK_*"""
+    defaults = {
+        'host': '0.0.0.0',
+        'port': 5000,
+        'workers': 1,
+        'threads': 4,
+        'connection_limit': 100,
+        'backlog': 1024
+    }
+    settings = dict(defaults)
+    settings.update(load_config().get('server', {}))
+    for key, default in defaults.items():
+        value = os.environ.get(f'KIOSK_{key.upper()}')
+        if value:
+            settings[key] = type(default)(value)
+    return settings
 
 def get_chart_data():
     """Wczytaj dane z pliku Export.xlsx - dla kompatybilności (nie używane)"""
     return []
 
-def get_chart_data_for_machine(kod='1310', start_day=1):
-    """Wczytaj dane dla konkretnej maszyny z Export.xlsx - osobno dla każdej brygady (A, B, C) dzienne i narastające"""
+# Szerokość okna suwaka dni na wykresie kiosku
+CHART_WINDOW_DAYS = 7
+# Formaty serii wykresów: full - obiekt z x/y na serię, compact - wspólna oś dni
+SERIES_FORMATS = ('full', 'compact')
+
+def compact_series(entries):
+    """
+    Format kompaktowy serii: jedna oś dni i gęste tablice wartości całkowitych
+    (None w dniach bez wartości) - entries to lista (opis serii, dni, wartości).
+    """
+    days, columns = dense_series([(x, y) for _, x, y in entries])
+    return {
+        'format': 'compact',
+        'days': days,
+        'series': [{**meta, 'y': column} for (meta, _, _), column in zip(entries, columns)]
+    }
+
+def get_chart_data_for_machine(kod='1310', start_day=1, fmt='full'):
+    """
+    Wczytaj dane dla konkretnej maszyny z Export.xlsx - osobno dla każdej brygady (A, B, C) dzienne i narastające.
+    start_day=None zwraca cały miesiąc (okno suwaka wycina przeglądarka).
+    """
+    with server_timing('chart_data'):
+        if dataset.machine_version(str(kod)) is None or (start_day is not None and not 1 <= start_day <= 31):
+            return build_chart_data_for_machine(kod, start_day, fmt)
+        return chart_data_cache.get((str(kod), start_day, fmt),
+                                    lambda: build_chart_data_for_machine(kod, start_day, fmt))
+
+def build_chart_data_for_machine(kod, start_day, fmt='full'):
+    """Zbuduj serie 7-dniowego okna (lub całego miesiąca) dla maszyny"""
     try:
-        # Wczytaj dane z Export.xlsx
-        df_long = load_long()
+        # Dane maszyny z indeksu snapshotu (bez pandas)
+        maszyna = dataset.index().get(str(kod))
         
-        if df_long.empty:
-            return {'series': []}
+        if maszyna is None:
+            if fmt == 'compact':
+                return {**compact_series([]), 'window_days': CHART_WINDOW_DAYS}
+            return {'series': [], 'window_days': CHART_WINDOW_DAYS}
         
-        # Filtruj dane dla wybranej maszyny
-        df_maszyna = df_long[df_long['Kod'] == str(kod)].copy()
+        # Pobierz 7 dni od start_day (bez start_day - wszystkie dni)
+        end_day = start_day + CHART_WINDOW_DAYS - 1 if start_day is not None else None
         
-        if df_maszyna.empty:
-            return {'series': []}
-        
-        # Pobierz 7 dni od start_day
-        end_day = start_day + 6
-        
-        series_data = []
+        entries = []
         kolory_slupki = {'A': '#0ea5e9', 'B': '#FF6B35', 'C': '#6b7280'}
         kolory_linie = {'A': '#0284c7', 'B': '#f97316', 'C': '#4b5563'}
         
-        # Słupki dla wartości dziennych (brygady A, B, C)
-        for brygada in ['A', 'B', 'C']:
-            mask = (df_maszyna['Typ'] == 'Dzienne') & (df_maszyna['Brygada'] == brygada) & \
-                   (df_maszyna['Dzien'] >= start_day) & (df_maszyna['Dzien'] <= end_day)
-            filtered = df_maszyna[mask].copy().sort_values('Dzien')
-            
-            if not filtered.empty:
-                series_data.append({
-                    'type': 'bar',
-                    'name': brygada,
-                    'x': filtered['Dzien'].tolist(),
-                    'y': [round(v, 0) for v in filtered['Wartosc'].tolist()],
-                    'color': kolory_slupki.get(brygada, '#999999')
-                })
-        
-        # Linie dla wartości narastających (brygady A, B, C)
-        for brygada in ['A', 'B', 'C']:
-            mask = (df_maszyna['Typ'] == 'Narastające') & (df_maszyna['Brygada'] == brygada) & \
-                   (df_maszyna['Dzien'] >= start_day) & (df_maszyna['Dzien'] <= end_day)
-            filtered = df_maszyna[mask].copy().sort_values('Dzien')
-            
-            if not filtered.empty:
-                series_data.append({
-                    'type': 'line',
-                    'name': f'Narastająco {brygada}',
-                    'x': filtered['Dzien'].tolist(),
-                    'y': [round(v, 0) for v in filtered['Wartosc'].tolist()],
-                    'color': kolory_linie.get(brygada, '#666666')
-                })
+        # Słupki dla wartości dziennych (brygady A, B, C), potem linie dla narastających
+        for typ, chart_type in [('Dzienne', 'bar'), ('Narastające', 'line')]:
+            for brygada in ['A', 'B', 'C']:
+                days, values = maszyna['series'].get((typ, brygada), ([], []))
+                window = [(d, v) for d, v in zip(days, values) if start_day is None or start_day <= d <= end_day]
+                
+                if window:
+                    entries.append(({
+                        'type': chart_type,
+                        'name': brygada if chart_type == 'bar' else f'Narastająco {brygada}',
+                        'color': (kolory_slupki if chart_type == 'bar' else kolory_linie).get(brygada, '#999999')
+                    }, [d for d, _ in window], [v for _, v in window]))
         
-        return {'series': series_data}
+        if fmt == 'compact':
+            return {**compact_series(entries), 'window_days': CHART_WINDOW_DAYS}
+        series_data = [{**meta, 'x': x, 'y': [round(v, 0) for v in y]} for meta, x, y in entries]
+        return {'series': series_data, 'window_days': CHART_WINDOW_DAYS}
         
     except Exception as e:
         print(f"Błąd wczytywania danych dla maszyny {kod}: {e}")
-        return {'series': []}
+        return {'series': [], 'window_days': CHART_WINDOW_DAYS}
+
+# Cache listy slajdów - ważny dopóki katalog zdjęć się nie zmieni
+_slides_cache = {'signature': None, 'images': []}
+
+def _media_url(images_path, filename):
+    """Adres pliku slajdu z ?v= z rozmiaru i mtime - bez czytania treści (klipy wideo są duże)"""
+    st = os.stat(os.path.join(images_path, filename))
+    return f'/static/images/{quote(filename)}?v={st.st_size:x}-{st.st_mtime_ns:x}', st.st_size
+
+def _list_slide_images(images_path):
+    filenames = sorted(os.listdir(images_path))
+    # Klatki podglądu klipów nie są osobnymi slajdami
+    posters = {os.path.splitext(f)[0][:-len(POSTER_SUFFIX)]: f for f in filenames
+               if os.path.splitext(f)[0].endswith(POSTER_SUFFIX) and allowed_file(f) and not is_video(f)}
+    images = []
+    for filename in filenames:
+        if not allowed_file(filename) or filename in posters.values():
+            continue
+        url, size = _media_url(images_path, filename)
+        slide = {
+            'url': url,
+            'name': filename,
+            'type': 'video' if is_video(filename) else 'image',
+            'mime': mimetypes.guess_type(filename)[0],
+            'size': size
+        }
+        if slide['type'] == 'video':
+            poster = posters.get(os.path.splitext(filename)[0])
+            slide['poster'] = _media_url(images_path, poster)[0] if poster else None
+        images.append(slide)
+    return images
+
+def extract_poster(video_path):
+    """Zapisz klatkę podglądu klipu przez ffmpeg (jeśli dostępny); zwraca ścieżkę lub None"""
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        return None
+    poster_path = os.path.splitext(video_path)[0] + POSTER_SUFFIX + '.jpg'
+    try:
+        subprocess.run([ffmpeg, '-v', 'error', '-y', '-ss', str(POSTER_SECOND), '-i', video_path,
+                        '-frames:v', '1', '-vf', 'scale=1280:-2', poster_path],
+                       check=True, timeout=60, stdin=subprocess.DEVNULL)
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"⚠️  Nie udało się wygenerować podglądu {video_path}: {e}")
+        return None
+    return poster_path if os.path.exists(poster_path) else None
 
 def get_slide_images():
-    """Pobierz listę zdjęć do pokazu slajdów"""
+    """Pobierz listę zdjęć i klipów wideo (z klatką podglądu) do pokazu slajdów"""
     images_path = os.path.join(app.config['UPLOAD_FOLDER'])
-    if not os.path.exists(images_path):
+    signature = file_signature(images_path)
+    if signature is None:
         return []
     
-    images = []
-    for filename in os.listdir(images_path):
-        if allowed_file(filename):
-            images.append({
-                'url': f'/static/images/{filename}',
-                'name': filename
-            })
-    return images
+    if signature != _slides_cache['signature']:
+        _slides_cache['images'] = _list_slide_images(images_path)
+        _slides_cache['signature'] = signature
+    return _slides_cache['images']
 
-def load_long():
+def parse_export(path=EXPORT_FILE):
     """
-    Wczytaj dane z pliku Export.xlsx i przekształć do formy długiej (long format)
-    Format: Typ, Kod, Nazwa, Brygada, Dzien (1-31), Wartosc
+    Wczytaj i zwaliduj dane z pliku Export.xlsx w formie długiej (long format)
+    Format: Typ, Kod, Nazwa, Brygada, Dzien (1-31), Wartosc - (słownik kolumn, raport walidacji)
+    Plik bez danych do pokazania zgłasza ExportError z raportem.
     """
     try:
-        # Spróbuj wczytać arkusz 'Eksport', 'Export' lub pierwszy dostępny
+        columns, report = read_export(path)
+    except FileNotFoundError:
+        # Jeśli plik nie istnieje, zwróć puste kolumny
+        report = new_report()
+        report['warnings'].append(f'Brak pliku {path}')
+        return empty_columns(), report
+    except ExportError as e:
+        print(f"❌ Odrzucono {path}: {e} - kiosk pokazuje poprzednie dane")
+        raise
+    for warning in report['warnings']:
+        print(f"⚠️  {path}: {warning}")
+    return columns, report
+
+def ingest_export(path):
+    """Parsuj Export.xlsx z pomiarem czasu i liczby wierszy"""
+    try:
+        with EXCEL_PARSE_SECONDS.time(), server_timing('excel'):
+            df_long, report = parse_export(path)
+    except Exception:
+        EXCEL_REJECTS.inc()
+        raise
+    finally:
+        EXCEL_PARSES.inc()
+    EXCEL_ROWS.set(len(df_long['Wartosc']))
+    return df_long, report
+
+# Snapshot danych współdzielony przez wszystkie procesy robocze.
+# Odrzucony plik jest zapamiętany we wskaźniku snapshotu - nie jest parsowany ponownie
+dataset = SharedDataset(EXPORT_FILE, SNAPSHOT_DIR, ingest_export, empty_columns)
+
+# Cache wyników per wersja danych - równoczesne chybienia liczone są raz.
+# Dane jednej maszyny mają własną wersję - import paczki unieważnia tylko zmienione maszyny
+machines_cache = VersionedCache('machines', lambda: dataset.version)
+# Klucze pochodzą z zapytania - limit wpisów, a nieznane maszyny i dni nie trafiają do cache
+series_cache = VersionedCache('series', lambda key: dataset.machine_version(key[0]),
+                              max_entries=512, per_key=True)
+chart_data_cache = VersionedCache('chart_data', lambda key: dataset.machine_version(key[0]),
+                                  max_entries=2048, per_key=True)
+# Wykres HTML bez plotly.js (biblioteka ładowana osobno przez wykres.html)
+figure_cache = VersionedCache('figure', lambda key: dataset.machine_version(key[0]),
+                              max_entries=64, per_key=True)
+overview_cache = VersionedCache('overview', lambda: dataset.version)
+# Gotowa odpowiedź /api/content - przebudowywana tylko po zmianie bazy, zdjęć lub danych
+content_cache = VersionedCache('content', lambda: content_version())
+# Publiczna konfiguracja /api/config - gotowe bajty na wersję config.json
+config_cache = VersionedCache('config', lambda: str(file_signature(CONFIG_FILE)))
+# Wyrenderowane strony (/, /admin) - zależą od ustawień i inspiracji w kiosk.db oraz wersji zasobów
+page_cache = VersionedCache('pages', lambda: str([file_signature(DB_FILE), static_version()]))
+
+def invalidate_content():
+    """Unieważnij gotowe strony i treść po zapisie admina (inne procesy wykryją zmianę kiosk.db)"""
+    page_cache.clear()
+    content_cache.clear()
+
+def load_long():
+    """
+    Zwróć dane z Export.xlsx w formie długiej.
+    Plik jest parsowany raz - kolejne wywołania korzystają ze snapshotu,
+    przeładowywanego gdy plik lub snapshot (np. po uploadzie w innym procesie) się zmieni.
+    """
+    return dataset.frame()
+
+# ==================== ZASOBY FRONT-ENDU ====================
+
+VENDOR_MANIFEST_FILE = os.path.join('static', 'vendor', 'assets.json')
+
+def plotly_cdn_url():
+    """CDN z tą samą wersją plotly.js, której używa pakiet plotly do generowania wykresu"""
+    from plotly.offline import get_plotlyjs_version
+    return f'https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js'
+
+# Biblioteki budowane lokalnie przez build_assets.py; bez nich szablony ładują je z CDN
+VENDOR_ASSETS = {
+    'tailwind': {'tag': 'link', 'cdn_tag': 'script', 'cdn': 'https://cdn.tailwindcss.com'},
+    'fonts': {'tag': 'link',
+              'cdn': 'https://fonts.googleapis.com/css2?family=Roboto:wght@300;400;500;700&display=swap'},
+    'chartjs': {'tag': 'script', 'cdn': 'https://cdn.jsdelivr.net/npm/chart.js@4.4.1/dist/chart.umd.js'},
+    'plotly': {'tag': 'script', 'cdn': plotly_cdn_url},
+}
+# Pliki, od których zależy HTML stron (adresy z ?v=)
+STATIC_PAGE_FILES = [VENDOR_MANIFEST_FILE, os.path.join('static', 'js', 'main.js'),
+                     os.path.join('static', 'css', 'style.css')]
+
+_static_hashes = {}
+_vendor_manifest = {'signature': None, 'assets': {}}
+
+def static_url(path):
+    """Adres pliku ze static/ z ?v=skrót treści - przeglądarka może go trzymać bez rewalidacji"""
+    full_path = os.path.join('static', path)
+    signature = file_signature(full_path)
+    cached = _static_hashes.get(path)
+    if cached is None or cached[0] != signature:
+        digest = None
+        if signature is not None:
+            with open(full_path, 'rb') as f:
+                digest = hashlib.sha1(f.read()).hexdigest()[:12]
+        cached = _static_hashes[path] = (signature, digest)
+    return f'/static/{path}?v={cached[1]}' if cached[1] else f'/static/{path}'
+
+def vendor_manifest():
+    """Zbudowane biblioteki z static/vendor/assets.json (cache do zmiany pliku)"""
+    signature = file_signature(VENDOR_MANIFEST_FILE)
+    if signature != _vendor_manifest['signature']:
         try:
-            df = pd.read_excel('Export.xlsx', sheet_name='Eksport', engine='openpyxl')
-        except ValueError:
-            try:
-                df = pd.read_excel('Export.xlsx', sheet_name='Export', engine='openpyxl')
-            except ValueError:
-                # Jeśli żaden nie istnieje, wczytaj pierwszy arkusz
-                df = pd.read_excel('Export.xlsx', sheet_name=0, engine='openpyxl')
-        
-        # Sprawdź czy kolumny to 'Unnamed' - wtedy brak nagłówków
-        if str(df.columns[0]).startswith('Unnamed'):
-            # Brak nagłówków - pierwsze 3 kolumny to Typ, Kod, Brygada (bez Nazwa)
-            df.columns = ['Typ', 'Kod', 'Brygada'] + list(df.columns[3:])
-            df['Nazwa'] = ''  # Dodaj pustą kolumnę Nazwa
-            first_day_col = 3
-            id_vars = ['Typ', 'Kod', 'Nazwa', 'Brygada']
-        elif 'Nazwa' in df.columns or len(df.columns) >= 4:
-            # Format z kolumną Nazwa
-            df.columns = ['Typ', 'Kod', 'Nazwa', 'Brygada'] + list(df.columns[4:])
-            first_day_col = 4
-            id_vars = ['Typ', 'Kod', 'Nazwa', 'Brygada']
+            with open(VENDOR_MANIFEST_FILE, 'r', encoding='utf-8') as f:
+                assets = json.load(f)
+        except (OSError, ValueError):
+            assets = {}
+        # Tylko wpisy, których pliki istnieją
+        _vendor_manifest['assets'] = {name: entry for name, entry in assets.items()
+                                      if os.path.exists(os.path.join('static', entry.get('file', '')))}
+        _vendor_manifest['signature'] = signature
+    return _vendor_manifest['assets']
+
+def vendor_url(name):
+    """Adres lokalnej biblioteki lub None, gdy nie została zbudowana"""
+    entry = vendor_manifest().get(name)
+    return static_url(entry['file']) if entry else None
+
+def vendor_tags(*names):
+    """Znaczniki <script>/<link> bibliotek - lokalne pliki z build_assets.py lub CDN"""
+    tags = []
+    for name in names:
+        asset = VENDOR_ASSETS[name]
+        url = vendor_url(name)
+        tag = asset['tag']
+        if url is None:
+            url = asset['cdn']() if callable(asset['cdn']) else asset['cdn']
+            tag = asset.get('cdn_tag', tag)
+        if tag == 'script':
+            tags.append(f'<script src="{escape(url)}"></script>')
         else:
-            # Format bez nazwy (Typ, Kod, Brygada)
-            df.columns = ['Typ', 'Kod', 'Brygada'] + list(df.columns[3:])
-            df['Nazwa'] = ''  # Dodaj pustą kolumnę Nazwa
-            first_day_col = 3
-            id_vars = ['Typ', 'Kod', 'Nazwa', 'Brygada']
-        
-        # Przekształć nagłówki dni (kolumny od first_day_col+) na int
-        day_cols = []
-        for col in df.columns[first_day_col:]:
-            try:
-                day_cols.append(int(col))
-            except (ValueError, TypeError):
-                # Jeśli nie można przekonwertować na int, pomiń kolumnę
-                pass
-        
-        # Wybierz tylko kolumny podstawowe + dni jako int
-        valid_cols = id_vars + [c for c in df.columns[first_day_col:] if c in day_cols or str(c).isdigit()]
-        df = df[valid_cols]
-        
-        # Zmień nazwy kolumn dni na int
-        col_rename = {}
-        for col in df.columns[first_day_col:]:
-            try:
-                col_rename[col] = int(col)
-            except (ValueError, TypeError):
-                pass
-        df.rename(columns=col_rename, inplace=True)
-        
-        # Przekształć do formy długiej (melt)
-        value_vars = [col for col in df.columns if isinstance(col, int) and 1 <= col <= 31]
-        
-        df_long = pd.melt(
-            df,
-            id_vars=id_vars,
-            value_vars=value_vars,
-            var_name='Dzien',
-            value_name='Wartosc'
-        )
-        
-        # Usuń wiersze z NaN w kolumnie Wartosc
-        df_long = df_long.dropna(subset=['Wartosc'])
-        
-        # Konwertuj typy
-        df_long['Typ'] = df_long['Typ'].astype(str)
-        df_long['Kod'] = df_long['Kod'].astype(str)
-        df_long['Nazwa'] = df_long['Nazwa'].astype(str)
-        df_long['Brygada'] = df_long['Brygada'].astype(str)
-        df_long['Dzien'] = df_long['Dzien'].astype(int)
-        df_long['Wartosc'] = df_long['Wartosc'].astype(float)
-        
-        return df_long
+            tags.append(f'<link rel="stylesheet" href="{escape(url)}">')
+    return Markup('\n    '.join(tags))
+
+def ensure_vendor_assets():
+    """
+    Przy starcie: zbuduj brakujący plotly.js z zainstalowanego pakietu plotly (bez sieci)
+    i ostrzeż o bibliotekach, które strony nadal będą ładować z CDN
+    """
+    if 'plotly' not in vendor_manifest():
+        import build_assets
+        build_assets.build(['plotly'])
+    missing = [name for name in VENDOR_ASSETS if name not in vendor_manifest()]
+    if missing:
+        print(f"⚠️  Brak lokalnych zasobów ({', '.join(missing)}) - strony ładują je z CDN, "
+              f"co wymaga internetu w kiosku. Zbuduj je: python build_assets.py")
+    return missing
+
+def static_version():
+    """Wersja plików, od których zależą adresy w HTML stron"""
+    return str([file_signature(path) for path in STATIC_PAGE_FILES])
+
+app.jinja_env.globals.update(static_url=static_url, vendor_tags=vendor_tags)
+
+@app.after_request
+def cache_static_assets(response):
+    """Pliki statyczne pod adresem z ?v= (skrót treści) są niezmienne - przeglądarka trzyma je rok"""
+    if response.status_code in (200, 206) and request.path.startswith('/static/') and request.args.get('v'):
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+# ==================== ROZGRZEWKA (WARM-UP) ====================
+
+# Stan rozgrzewki - raportowany przez /api/ready
+warmup_state = {'ready': False}
+
+def warm_up():
+    """
+    Rozgrzej cache przed przyjmowaniem ruchu: lokalne biblioteki front-endu, snapshot
+    danych, indeks maszyn, domyślny wykres /wykres (z importem plotly), ustawienia,
+    inspiracje i slajdy
+    """
+    started = time.perf_counter()
+    steps = {}
     
-    except FileNotFoundError:
-        # Jeśli plik nie istnieje, zwróć pusty DataFrame
-        return pd.DataFrame(columns=['Typ', 'Kod', 'Nazwa', 'Brygada', 'Dzien', 'Wartosc'])
-    except Exception as e:
-        print(f"Błąd wczytywania danych z Export.xlsx: {e}")
-        return pd.DataFrame(columns=['Typ', 'Kod', 'Nazwa', 'Brygada', 'Dzien', 'Wartosc'])
+    def step(name, func):
+        t = time.perf_counter()
+        try:
+            func()
+        except Exception as e:
+            print(f"Błąd rozgrzewki ({name}): {e}")
+        steps[name] = round((time.perf_counter() - t) * 1000, 1)
+    
+    def default_figure():
+        maszyny = get_machines_list()
+        if maszyny:
+            get_figure_html(maszyny[0]['kod'], maszyny[0]['label'])
+    
+    step('vendor', ensure_vendor_assets)
+    step('dataset', dataset.refresh)
+    mark_startup('dataset_ready')
+    step('index', dataset.index)
+    step('figure', default_figure)
+    step('settings', get_settings)
+    step('inspirations', get_inspirations)
+    step('slides', get_slide_images)
+    
+    warmup_state.update({
+        'ready': True,
+        'finished_at': datetime.now().isoformat(timespec='seconds'),
+        'duration_ms': round((time.perf_counter() - started) * 1000, 1),
+        'steps': steps
+    })
+    mark_startup('warmup_done')
+    print(f"🔥 Rozgrzewka zakończona w {warmup_state['duration_ms']} ms: "
+          + ', '.join(f"{name} {ms} ms" for name, ms in steps.items()))
+    return warmup_state
 
 # ==================== TRASY (ROUTES) ====================
 
-@app.route('/')
-def index():
-    """Strona główna - Dashboard"""
+@app.before_request
+def mark_first_request():
+    """Pomiar czasu do pierwszego żądania"""
+    if 'first_request' not in startup_timings:
+        mark_startup('first_request')
+
+@app.after_request
+def mark_first_response(response):
+    """Pomiar czasu do pierwszej odpowiedzi"""
+    if 'first_response' not in startup_timings:
+        mark_startup('first_response')
+    return response
+
+@app.before_request
+def start_request_metrics():
+    """Początek pomiaru żądania (metryki /metrics)"""
+    g.request_started = time.perf_counter()
+    HTTP_IN_FLIGHT.inc()
+    metrics.start_flusher(METRICS_DIR)
+
+@app.after_request
+def record_response_metrics(response):
+    """Status i rozmiar odpowiedzi"""
+    g.response_status = response.status_code
+    if response.content_length is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_RESPONSE_SIZE.observe(response.content_length, route=route)
+    return response
+
+@app.after_request
+def add_server_timing(response):
+    """Nagłówek Server-Timing z czasami etapów żądania (ms)"""
+    spans = g.get('server_timing', {})
+    parts = [f'{name};dur={seconds * 1000:.1f}' for name, seconds in spans.items()]
+    started = g.get('request_started')
+    if started is not None:
+        parts.append(f'total;dur={(time.perf_counter() - started) * 1000:.1f}')
+    if parts:
+        response.headers['Server-Timing'] = ', '.join(parts)
+    return response
+
+@app.before_request
+def start_profiler():
+    """?profile=1 (raport tekstowy) lub ?profile=prof (plik .prof) - tylko dla admina"""
+    mode = request.args.get('profile')
+    if mode not in ('1', 'prof'):
+        return None
+    if not session.get('authenticated'):
+        return jsonify({'error': 'Brak autoryzacji'}), 401
+    if not profile_lock.acquire(blocking=False):
+        return jsonify({'error': 'Trwa profilowanie innego żądania'}), 409
+    g.profiler = cProfile.Profile()
+    g.profiler.enable()
+
+def stop_profiler():
+    """Zatrzymaj profiler bieżącego żądania i zwolnij blokadę"""
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        profile_lock.release()
+    return profiler
+
+@app.after_request
+def profile_response(response):
+    """Zastąp odpowiedź raportem cProfile"""
+    profiler = stop_profiler()
+    if profiler is None:
+        return response
+    
+    endpoint = request.endpoint or 'unmatched'
+    if request.args.get('profile') == 'prof':
+        # Plik do analizy w snakeviz / pstats
+        profiler.create_stats()
+        filename = f"{endpoint}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.prof"
+        return Response(marshal.dumps(profiler.stats), mimetype='application/octet-stream',
+                        headers={'Content-Disposition': f'attachment; filename={filename}'})
+    
+    sort = request.args.get('sort', 'cumulative')
+    if sort not in PROFILE_SORT_KEYS:
+        sort = 'cumulative'
+    report = io.StringIO()
+    report.write(f"{request.method} {request.full_path} -> {response.status}, "
+                 f"{response.calculate_content_length() or 0} B\n")
+    pstats.Stats(profiler, stream=report).sort_stats(sort).print_stats(PROFILE_LIMIT)
+    return Response(report.getvalue(), mimetype='text/plain')
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    """Koniec pomiaru żądania - liczniki i histogram czasu per trasa"""
+    stop_profiler()
+    started = g.pop('request_started', None)
+    if started is None:
+        return
+    HTTP_IN_FLIGHT.dec()
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    HTTP_REQUESTS.inc(route=route, method=request.method, status=g.pop('response_status', 500))
+    HTTP_LATENCY.observe(time.perf_counter() - started, route=route)
+
+def cached_page(key, render):
+    """HTML strony z cache (wyrenderowany i skompresowany raz na wersję kiosk.db)"""
+    with server_timing('page'):
+        return page_cache.get(key, lambda: prebuilt_body(f'page-{key}', render().encode('utf-8')))
+
+def render_index():
     header_title = get_setting('header_title')
     footer_note = get_setting('footer_note')
     inspirations = get_inspirations()
@@ -303,6 +891,11 @@ def index():
                          footer_note=footer_note,
                          inspirations=inspirations)
 
+@app.route('/')
+def index():
+    """Strona główna - Dashboard (z cache - po zaniku prądu wszystkie kioski startują naraz)"""
+    return prebuilt_response(cached_page('index', render_index), 'text/html')
+
 @app.route('/admin', methods=['GET', 'POST'])
 def admin():
     """Panel administracyjny"""
@@ -319,20 +912,28 @@ def admin():
     
     # Sprawdź czy użytkownik jest zalogowany
     if not session.get('authenticated'):
-        return render_template('admin.html', authenticated=False)
+        return prebuilt_response(cached_page('admin-login', lambda: render_template('admin.html', authenticated=False)),
+                                 'text/html')
     
-    # Użytkownik zalogowany - pokaż panel
+    # Użytkownik zalogowany - pokaż panel (tylko prywatny cache przeglądarki)
+    return prebuilt_response(cached_page('admin', render_admin_panel), 'text/html',
+                             cache_control='private, no-cache')
+
+def render_admin_panel():
     header_title = get_setting('header_title')
     footer_note = get_setting('footer_note')
     about_text = get_setting('about_text')
-    inspirations = get_inspirations()
+    # Tylko pierwsza strona - kolejne i wyszukiwanie przez /api/inspirations/search
+    inspirations, inspirations_total = search_inspirations('')
     
     return render_template('admin.html',
                          authenticated=True,
                          header_title=header_title,
                          footer_note=footer_note,
                          about_text=about_text,
-                         inspirations=inspirations)
+                         inspirations=inspirations,
+                         inspirations_total=inspirations_total,
+                         inspirations_page_size=INSPIRATIONS_PAGE_SIZE)
 
 @app.route('/admin/logout')
 def admin_logout():
@@ -355,6 +956,7 @@ def update_settings():
         update_setting('footer_note', data['footer_note'])
     if data and 'about_text' in data:
         update_setting('about_text', data['about_text'])
+    invalidate_content()
     
     return jsonify({'success': True})
 
@@ -365,12 +967,14 @@ def add_inspiration():
         return jsonify({'error': 'Brak autoryzacji'}), 401
     
     data = request.json or {}
-    conn = sqlite3.connect('kiosk.db')
-    c = conn.cursor()
-    c.execute("INSERT INTO inspirations (title, description, image_url) VALUES (?, ?, ?)",
-             (data.get('title', ''), data.get('description', ''), data.get('image_url', '')))
-    conn.commit()
-    conn.close()
+    with SQLITE_SECONDS.time(query='inspirations_insert'), server_timing('sqlite'):
+        conn = sqlite3.connect(DB_FILE)
+        c = conn.cursor()
+        c.execute("INSERT INTO inspirations (title, description, image_url) VALUES (?, ?, ?)",
+                 (data.get('title', ''), data.get('description', ''), data.get('image_url', '')))
+        conn.commit()
+        conn.close()
+    invalidate_content()
     
     return jsonify({'success': True})
 
@@ -380,17 +984,19 @@ def delete_inspiration(inspiration_id):
     if not session.get('authenticated'):
         return jsonify({'error': 'Brak autoryzacji'}), 401
     
-    conn = sqlite3.connect('kiosk.db')
-    c = conn.cursor()
-    c.execute("DELETE FROM inspirations WHERE id=?", (inspiration_id,))
-    conn.commit()
-    conn.close()
+    with SQLITE_SECONDS.time(query='inspirations_delete'), server_timing('sqlite'):
+        conn = sqlite3.connect(DB_FILE)
+        c = conn.cursor()
+        c.execute("DELETE FROM inspirations WHERE id=?", (inspiration_id,))
+        conn.commit()
+        conn.close()
+    invalidate_content()
     
     return jsonify({'success': True})
 
 @app.route('/api/upload', methods=['POST'])
 def upload_file():
-    """Upload pliku zdjęcia"""
+    """Upload pliku zdjęcia lub klipu wideo (opcjonalnie z klatką podglądu w polu poster)"""
     if not session.get('authenticated'):
         return jsonify({'error': 'Brak autoryzacji'}), 401
     
@@ -410,10 +1016,23 @@ def upload_file():
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
         file.save(filepath)
         
+        poster = None
+        if is_video(filename):
+            poster_file = request.files.get('poster')
+            if poster_file and poster_file.filename and allowed_file(poster_file.filename) \
+                    and not is_video(poster_file.filename):
+                poster_ext = os.path.splitext(secure_filename(poster_file.filename))[1].lower()
+                poster = os.path.splitext(filepath)[0] + POSTER_SUFFIX + poster_ext
+                poster_file.save(poster)
+            else:
+                poster = extract_poster(filepath)
+        invalidate_content()
+        
         return jsonify({
             'success': True,
             'url': f'/static/images/{filename}',
-            'filename': filename
+            'filename': filename,
+            'poster': f'/static/images/{os.path.basename(poster)}' if poster else None
         })
     
     return jsonify({'error': 'Niedozwolony typ pliku'}), 400
@@ -432,47 +1051,200 @@ def upload_excel():
         return jsonify({'error': 'Nie wybrano pliku'}), 400
     
     # Sprawdź czy to plik Excel
-    if file and file.filename and (file.filename.endswith('.xlsx') or file.filename.endswith('.xls')):
-        # Zapisz jako Export.xlsx (zastąp istniejący)
-        filepath = 'Export.xlsx'
-        file.save(filepath)
+    if file and file.filename and file.filename.lower().endswith('.xlsx'):
+        # Sparsuj raz i opublikuj snapshot dla wszystkich procesów; Export.xlsx jest
+        # zastępowany (atomowo) dopiero gdy walidacja przyjmie plik
+        # Unikalny plik tymczasowy z rozszerzeniem .xlsx - openpyxl rozpoznaje format po rozszerzeniu
+        upload_path = dataset.upload_path('.xlsx')
+        try:
+            file.save(upload_path)
+        except OSError:
+            os.remove(upload_path)
+            raise
+        pointer, accepted = dataset.replace_source(upload_path)
+        if not accepted:
+            return jsonify({
+                'error': 'Plik Export.xlsx odrzucony - kiosk pokazuje poprzednie dane',
+                'report': pointer['rejected']['report']
+            }), 422
         
         return jsonify({
             'success': True,
             'message': 'Plik Export.xlsx został zaktualizowany',
-            'filename': 'Export.xlsx'
+            'filename': 'Export.xlsx',
+            'report': pointer.get('report')
         })
     
-    return jsonify({'error': 'Niedozwolony typ pliku - wymagany plik .xlsx lub .xls'}), 400
+    return jsonify({'error': 'Niedozwolony typ pliku - wymagany plik .xlsx'}), 400
+
+@app.route('/api/ingest-report')
+def api_ingest_report():
+    """Raport walidacji Export.xlsx (panel admina): plik z danymi i ostatni odrzucony"""
+    if not session.get('authenticated'):
+        return jsonify({'error': 'Brak autoryzacji'}), 401
+    response = jsonify(dataset.ingest_report())
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+# Kolumny paczki importu przyrostowego (CSV/JSON, nazwy bez rozróżniania wielkości liter)
+INGEST_FIELDS = ['kod', 'typ', 'brygada', 'dzien', 'wartosc']
+INGEST_MAX_ERRORS = 20
+
+def parse_ingest_batch(records):
+    """
+    Sprawdź i znormalizuj wiersze paczki (słowniki kod, typ, brygada, dzien, wartosc[, nazwa]).
+    Pusta wartosc usuwa wiersz. Zwraca (wiersze, błędy).
+    """
+    rows = []
+    errors = []
+    for number, record in enumerate(records, start=1):
+        if not isinstance(record, dict):
+            errors.append(f'Wiersz {number}: oczekiwano obiektu')
+            continue
+        record = {str(k).strip().lower(): v for k, v in record.items()}
+        missing = [f for f in INGEST_FIELDS if f != 'wartosc' and cell_text(record.get(f)) == '']
+        if missing:
+            errors.append(f"Wiersz {number}: brak pól {', '.join(missing)}")
+            continue
+        try:
+            dzien = float(str(record['dzien']).strip())
+        except ValueError:
+            dzien = None
+        # "3.0" to dzień 3, ale "3.7" nie może zostać obcięte do 3
+        if dzien is None or not dzien.is_integer():
+            errors.append(f"Wiersz {number}: nieprawidłowy dzień '{record['dzien']}'")
+            continue
+        if not 1 <= dzien <= 31:
+            errors.append(f"Wiersz {number}: dzień '{record['dzien']}' spoza zakresu 1-31")
+            continue
+        dzien = int(dzien)
+        wartosc = record.get('wartosc')
+        if wartosc is not None and str(wartosc).strip() != '':
+            try:
+                wartosc = float(str(wartosc).strip().replace(',', '.'))
+            except (ValueError, OverflowError):
+                errors.append(f"Wiersz {number}: nieprawidłowa wartość '{record['wartosc']}'")
+                continue
+            # NaN/inf lub liczba poza float32 zapisałyby się w snapshocie jako NaN/inf i zepsuły JSON wykresów
+            if not is_storable(wartosc):
+                errors.append(f"Wiersz {number}: wartość '{record['wartosc']}' nie jest skończoną liczbą "
+                              f"z zakresu ±{MAX_VALUE:.3g}")
+                continue
+        else:
+            wartosc = None
+        # Identyfikatory jak przy czytaniu Export.xlsx (1310.0 -> '1310')
+        rows.append({
+            'Typ': cell_text(record['typ']),
+            'Kod': cell_text(record['kod']),
+            'Brygada': cell_text(record['brygada']),
+            'Dzien': dzien,
+            'Wartosc': wartosc,
+            'Nazwa': cell_text(record.get('nazwa'))
+        })
+    return rows, errors
+
+def read_ingest_records():
+    """Rekordy paczki z żądania: JSON (lista lub {"rows": [...]}), CSV w treści lub plik batch_file"""
+    if 'batch_file' in request.files:
+        text = request.files['batch_file'].read().decode('utf-8-sig')
+    elif request.is_json:
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            data = data.get('rows')
+        if not isinstance(data, list):
+            raise ValueError('Oczekiwano listy wierszy lub obiektu {"rows": [...]}')
+        return data
+    else:
+        text = request.get_data(as_text=True)
+    
+    try:
+        dialect = csv.Sniffer().sniff(text[:2048], delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    return list(csv.DictReader(io.StringIO(text), dialect=dialect))
+
+@app.route('/api/ingest', methods=['POST'])
+def ingest_batch():
+    """Import przyrostowy: dopisz/popraw wiersze bez ponownego wgrywania Export.xlsx"""
+    if not session.get('authenticated'):
+        return jsonify({'error': 'Brak autoryzacji'}), 401
+    
+    try:
+        records = read_ingest_records()
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({'error': f'Nieprawidłowa paczka: {e}'}), 400
+    
+    rows, errors = parse_ingest_batch(records)
+    if errors:
+        return jsonify({'error': 'Błędy w paczce - nic nie zaimportowano',
+                        'details': errors[:INGEST_MAX_ERRORS], 'error_count': len(errors)}), 400
+    if not rows:
+        return jsonify({'error': 'Pusta paczka'}), 400
+    
+    with server_timing('ingest'):
+        pointer, stats, changed = dataset.apply_batch(rows)
+    
+    return jsonify({
+        'success': True,
+        'version': pointer['version'],
+        'rows': pointer['rows'],
+        'machines': changed,
+        **stats
+    })
+
+def conditional_json(etag, build):
+    """
+    Odpowiedź JSON z ETag opartym o wersję danych - gdy klient ma aktualną
+    wersję (If-None-Match), zwracane jest 304 bez budowania danych.
+    """
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def series_format():
+    """Format serii z ?format= (compact - wspólna oś dni; nieznany format - pełny)"""
+    fmt = request.args.get('format', 'full')
+    return fmt if fmt in SERIES_FORMATS else 'full'
 
 @app.route('/api/chart-data')
 def chart_data():
-    """Zwróć dane do wykresów dla konkretnej maszyny"""
+    """
+    Zwróć dane do wykresów dla konkretnej maszyny: okno 7 dni od start_day
+    lub z ?range=month cały miesiąc (jedno zapytanie na maszynę i wersję danych).
+    """
     kod = request.args.get('kod', '1310')
-    start_day = int(request.args.get('start_day', 1))
-    data = get_chart_data_for_machine(kod=kod, start_day=start_day)
-    return jsonify(data)
+    fmt = series_format()
+    if request.args.get('range') == 'month':
+        start_day = None
+    else:
+        start_day = int(request.args.get('start_day', 1))
+    etag = f"chart-{kod}-{'month' if start_day is None else start_day}-{fmt}-{dataset.machine_version(kod)}"
+    return conditional_json(etag, lambda: get_chart_data_for_machine(kod=kod, start_day=start_day, fmt=fmt))
+
+def get_machines_list():
+    """Lista dostępnych maszyn (kod + etykieta) z Export.xlsx"""
+    with server_timing('machines'):
+        return machines_cache.get('all', build_machines_list)
+
+def build_machines_list():
+    """Zbuduj listę maszyn z indeksu snapshotu"""
+    maszyny = []
+    for kod, nazwa in dataset.index().pairs:
+        if nazwa and nazwa.strip():
+            maszyny.append({'kod': kod, 'label': f"{kod} {nazwa}"})
+        else:
+            maszyny.append({'kod': kod, 'label': kod})
+    return maszyny
 
 @app.route('/api/machines')
 def get_machines():
     """Zwróć listę dostępnych maszyn z Export.xlsx"""
     try:
-        df_long = load_long()
-        if df_long.empty:
-            return jsonify([])
-        
-        # Pobierz unikalne maszyny (kod + nazwa)
-        maszyny_df = df_long[['Kod', 'Nazwa']].drop_duplicates().sort_values('Kod')
-        maszyny = []
-        for _, row in maszyny_df.iterrows():
-            kod = row['Kod']
-            nazwa = row['Nazwa']
-            if nazwa and str(nazwa).strip():
-                maszyny.append({'kod': kod, 'label': f"{kod} {nazwa}"})
-            else:
-                maszyny.append({'kod': kod, 'label': kod})
-        
-        return jsonify(maszyny)
+        return jsonify(get_machines_list())
     except Exception as e:
         print(f"Błąd pobierania listy maszyn: {e}")
         return jsonify([])
@@ -489,137 +1261,226 @@ def api_inspirations():
     inspirations = get_inspirations()
     return jsonify(inspirations)
 
-@app.route('/api/content')
-def get_content():
-    """Zwróć całą treść dla strony głównej (dla auto-refresh)"""
-    return jsonify({
+@app.route('/api/inspirations/search')
+def api_inspirations_search():
+    """
+    Wyszukiwanie inspiracji (panel admina): ?q=tekst&page=1&per_page=20
+    Wyniki posortowane wg trafności; pusty q - najnowsze.
+    """
+    if not session.get('authenticated'):
+        return jsonify({'error': 'Brak autoryzacji'}), 401
+    query = request.args.get('q', '').strip()
+    try:
+        page = max(1, int(request.args.get('page', 1)))
+        per_page = min(INSPIRATIONS_MAX_PAGE_SIZE, max(1, int(request.args.get('per_page', INSPIRATIONS_PAGE_SIZE))))
+    except ValueError:
+        return jsonify({'error': 'page i per_page muszą być liczbami całkowitymi'}), 400
+    results, total = search_inspirations(query, page, per_page)
+    response = jsonify({'query': query, 'page': page, 'per_page': per_page, 'total': total, 'results': results})
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+def get_content_data():
+    """Cała treść dla strony głównej (dla auto-refresh)"""
+    return {
         'header_title': get_setting('header_title'),
         'footer_note': get_setting('footer_note'),
         'about_text': get_setting('about_text'),
         'inspirations': get_inspirations(),
         'chart_data': get_chart_data(),
         'slides': get_slide_images()
-    })
+    }
+
+def content_version():
+    """Wersja treści: plik bazy (ustawienia, inspiracje), katalog zdjęć i wersja danych"""
+    return (str(file_signature(DB_FILE)), str(file_signature(app.config['UPLOAD_FOLDER'])), dataset.version)
+
+def prebuilt_body(prefix, body):
+    """Gotowe bajty odpowiedzi i ich wersja gzip - ETag to skrót treści (ten sam we wszystkich procesach)"""
+    return {
+        'etag': f'{prefix}-{hashlib.sha1(body).hexdigest()[:16]}',
+        'body': body,
+        'gzip': gzip.compress(body, compresslevel=9)
+    }
+
+def prebuilt_response(snapshot, mimetype, cache_control='no-cache'):
+    """Odpowiedź z gotowych bajtów: gzip gdy klient go przyjmuje, 304 gdy ma aktualną wersję"""
+    use_gzip = 'gzip' in request.accept_encodings
+    etag = snapshot['etag'] + ('-gzip' if use_gzip else '')
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = Response(snapshot['gzip'] if use_gzip else snapshot['body'], mimetype=mimetype)
+        if use_gzip:
+            response.headers['Content-Encoding'] = 'gzip'
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    response.vary.add('Accept-Encoding')
+    return response
+
+def build_content_snapshot():
+    """Treść zserializowana do JSON i skompresowana raz"""
+    return prebuilt_body('content', (app.json.dumps(get_content_data()) + '\n').encode('utf-8'))
+
+def get_content_snapshot():
+    """Gotowa odpowiedź /api/content (cache na wersję treści)"""
+    with server_timing('content'):
+        return content_cache.get('all', build_content_snapshot)
+
+@app.route('/api/content')
+def get_content():
+    """Zwróć całą treść dla strony głównej (dla auto-refresh) - gotowe bajty, gzip gdy klient go przyjmuje"""
+    return prebuilt_response(get_content_snapshot(), 'application/json')
+
+@app.route('/api/config')
+def api_config():
+    """Konfiguracja kiosku dla main.js (interwały rotacji i odświeżania) - bez PINu"""
+    snapshot = config_cache.get('public', lambda: prebuilt_body(
+        'config', (app.json.dumps(get_public_config()) + '\n').encode('utf-8')))
+    return prebuilt_response(snapshot, 'application/json')
+
+@app.route('/api/debug/memory')
+def debug_memory():
+    """Zwróć zajętość pamięci danych (per kolumna) i pliku snapshotu - tylko dla admina"""
+    if not session.get('authenticated'):
+        return jsonify({'error': 'Brak autoryzacji'}), 401
+    return jsonify(dataset.memory_report())
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Metryki w formacie tekstowym Prometheus (wszystkie procesy robocze)"""
+    return Response(metrics.render(METRICS_DIR), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/ready')
+def ready():
+    """Gotowość serwera - 200 po zakończeniu rozgrzewki, 503 wcześniej"""
+    return jsonify(warmup_state), 200 if warmup_state['ready'] else 503
+
+@app.route('/api/debug/cache')
+def debug_cache():
+    """Zwróć liczniki cache i łączenia równoczesnych obliczeń (single-flight) - tylko dla admina"""
+    if not session.get('authenticated'):
+        return jsonify({'error': 'Brak autoryzacji'}), 401
+    return jsonify(get_cache_stats())
+
+@app.route('/api/debug/startup')
+def debug_startup():
+    """Zwróć raport czasu startu (time-to-first-request) i załadowanych bibliotek - tylko dla admina"""
+    if not session.get('authenticated'):
+        return jsonify({'error': 'Brak autoryzacji'}), 401
+    return jsonify(get_startup_report())
 
 # ==================== WYKRESY PLOTLY ====================
 
+def build_figure_html(kod, title):
+    """Wygeneruj HTML wykresu kombinowanego Plotly dla maszyny (słupki + linie)"""
+    import plotly.graph_objects as go
+    from plotly.offline import plot
+    
+    maszyna = dataset.index().get(kod) or {'series': {}}
+    
+    # Wygeneruj wykres kombinowany
+    fig = go.Figure()
+    
+    # Kolory dla brygad (słupki)
+    kolory_slupki = {'A': '#0ea5e9', 'B': '#FF6B35', 'C': '#6b7280'}  # niebieski, pomarańczowy, szary
+    kolory_linie = {'A': '#0284c7', 'B': '#f97316', 'C': '#4b5563'}  # ciemniejsze odcienie
+    
+    # Dodaj słupki dla wartości dziennych (brygady A, B, C) - oś Y lewa
+    for brygada in ['A', 'B', 'C']:
+        if ('Dzienne', brygada) in maszyna['series']:
+            days, values = maszyna['series'][('Dzienne', brygada)]
+            fig.add_trace(go.Bar(
+                x=days,
+                y=values,
+                name=brygada,
+                marker_color=kolory_slupki.get(brygada, '#999999'),
+                text=values,
+                textposition='outside',
+                texttemplate='%{text:.0f}',
+                yaxis='y'
+            ))
+    
+    # Dodaj linie dla wartości narastających (brygady A, B, C) - oś Y prawa
+    for brygada in ['A', 'B', 'C']:
+        if ('Narastające', brygada) in maszyna['series']:
+            days, values = maszyna['series'][('Narastające', brygada)]
+            fig.add_trace(go.Scatter(
+                x=days,
+                y=values,
+                mode='lines+markers',
+                name=f'Narastająco {brygada}',
+                line=dict(color=kolory_linie.get(brygada, '#666666'), width=2),
+                marker=dict(color=kolory_linie.get(brygada, '#666666'), size=6),
+                yaxis='y2'
+            ))
+    
+    # Dodaj linie Cel 0 i Cel 100 (opcjonalnie)
+    # Na razie pominięte - można dodać później jeśli potrzebne
+    
+    # Oblicz maksymalną wartość ze wszystkich danych dla synchronizacji osi Y
+    all_values = [v for _, values in maszyna['series'].values() for v in values]
+    if all_values:
+        max_value = int(max(all_values) * 1.1)  # Dodaj 10% marginesu
+    else:
+        max_value = 10000  # Wartość domyślna
+    
+    fig.update_layout(
+        title=title,
+        xaxis_title='',
+        hovermode='x unified',
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        barmode='group',
+        showlegend=True,
+        legend=dict(
+            orientation='h',
+            yanchor='bottom',
+            y=-0.2,
+            xanchor='center',
+            x=0.5
+        ),
+        xaxis=dict(
+            showgrid=True,
+            gridcolor='#e5e7eb',
+            dtick=1
+        ),
+        yaxis=dict(
+            title='Produkcja dzienna',
+            showgrid=True,
+            gridcolor='#e5e7eb',
+            side='left',
+            range=[0, max_value]
+        ),
+        yaxis2=dict(
+            title='Produkcja narastająca',
+            showgrid=False,
+            overlaying='y',
+            side='right',
+            range=[0, max_value]
+        )
+    )
+    
+    # Generuj sam HTML wykresu - plotly.js ładuje wykres.html z static/vendor (adres z ?v=) lub z CDN
+    return plot(fig, output_type='div', include_plotlyjs=False)
+
+def get_figure_html(kod, title):
+    """HTML wykresu Plotly dla maszyny (cache na wersję danych)"""
+    with server_timing('plotly'):
+        return figure_cache.get((kod, title), lambda: build_figure_html(kod, title))
+
 @app.route('/wykres')
 def wykres():
     """Strona z interaktywnym wykresem Plotly - wykres kombinowany (słupki + linie)"""
-    import plotly.graph_objects as go
-    from plotly.offline import plot
+    # Lista maszyn dla dropdown (kod + nazwa)
+    maszyny = get_machines_list()
     
-    df_long = load_long()
-    
-    # Pobierz unikalne wartości dla dropdown maszyn
-    if not df_long.empty:
-        # Utwórz listę maszyn (kod + nazwa)
-        maszyny_df = df_long[['Kod', 'Nazwa']].drop_duplicates().sort_values('Kod')
-        maszyny = []
-        for _, row in maszyny_df.iterrows():
-            kod = row['Kod']
-            nazwa = row['Nazwa']
-            if nazwa and nazwa.strip():
-                maszyny.append({'kod': kod, 'label': f"{kod} {nazwa}"})
-            else:
-                maszyny.append({'kod': kod, 'label': kod})
-        
+    if maszyny:
         # Domyślna maszyna
-        default_kod = maszyny[0]['kod'] if maszyny else ''
-        default_nazwa = maszyny[0]['label'] if maszyny else ''
-        
-        # Wygeneruj początkowy wykres kombinowany
-        fig = go.Figure()
-        
-        # Kolory dla brygad (słupki)
-        kolory_slupki = {'A': '#0ea5e9', 'B': '#FF6B35', 'C': '#6b7280'}  # niebieski, pomarańczowy, szary
-        kolory_linie = {'A': '#0284c7', 'B': '#f97316', 'C': '#4b5563'}  # ciemniejsze odcienie
-        
-        # Dodaj słupki dla wartości dziennych (brygady A, B, C) - oś Y lewa
-        for brygada in ['A', 'B', 'C']:
-            mask = (df_long['Typ'] == 'Dzienne') & (df_long['Kod'] == default_kod) & (df_long['Brygada'] == brygada)
-            filtered = df_long[mask].copy().sort_values('Dzien')
-            
-            if not filtered.empty:
-                fig.add_trace(go.Bar(
-                    x=filtered['Dzien'].tolist(),
-                    y=filtered['Wartosc'].tolist(),
-                    name=brygada,
-                    marker_color=kolory_slupki.get(brygada, '#999999'),
-                    text=filtered['Wartosc'].tolist(),
-                    textposition='outside',
-                    texttemplate='%{text:.0f}',
-                    yaxis='y'
-                ))
-        
-        # Dodaj linie dla wartości narastających (brygady A, B, C) - oś Y prawa
-        for brygada in ['A', 'B', 'C']:
-            mask = (df_long['Typ'] == 'Narastające') & (df_long['Kod'] == default_kod) & (df_long['Brygada'] == brygada)
-            filtered = df_long[mask].copy().sort_values('Dzien')
-            
-            if not filtered.empty:
-                fig.add_trace(go.Scatter(
-                    x=filtered['Dzien'].tolist(),
-                    y=filtered['Wartosc'].tolist(),
-                    mode='lines+markers',
-                    name=f'Narastająco {brygada}',
-                    line=dict(color=kolory_linie.get(brygada, '#666666'), width=2),
-                    marker=dict(color=kolory_linie.get(brygada, '#666666'), size=6),
-                    yaxis='y2'
-                ))
-        
-        # Dodaj linie Cel 0 i Cel 100 (opcjonalnie)
-        # Na razie pominięte - można dodać później jeśli potrzebne
-        
-        # Oblicz maksymalną wartość ze wszystkich danych dla synchronizacji osi Y
-        mask_all = df_long['Kod'] == default_kod
-        if mask_all.any():
-            max_value = df_long[mask_all]['Wartosc'].max()
-            max_value = int(max_value * 1.1)  # Dodaj 10% marginesu
-        else:
-            max_value = 10000  # Wartość domyślna
-        
-        fig.update_layout(
-            title=default_nazwa,
-            xaxis_title='',
-            hovermode='x unified',
-            plot_bgcolor='white',
-            paper_bgcolor='white',
-            barmode='group',
-            showlegend=True,
-            legend=dict(
-                orientation='h',
-                yanchor='bottom',
-                y=-0.2,
-                xanchor='center',
-                x=0.5
-            ),
-            xaxis=dict(
-                showgrid=True,
-                gridcolor='#e5e7eb',
-                dtick=1
-            ),
-            yaxis=dict(
-                title='Produkcja dzienna',
-                showgrid=True,
-                gridcolor='#e5e7eb',
-                side='left',
-                range=[0, max_value]
-            ),
-            yaxis2=dict(
-                title='Produkcja narastająca',
-                showgrid=False,
-                overlaying='y',
-                side='right',
-                range=[0, max_value]
-            )
-        )
-        
-        # Generuj HTML wykresu z w pełni osadzoną biblioteką Plotly (inline)
-        plot_html = plot(fig, output_type='div', include_plotlyjs=True)
-        
+        default_kod = maszyny[0]['kod']
+        default_nazwa = maszyny[0]['label']
+        plot_html = get_figure_html(default_kod, default_nazwa)
     else:
-        maszyny = []
         default_kod = ''
         default_nazwa = ''
         plot_html = '<div class="text-center text-gray-600 p-8">Brak danych - proszę dodać plik Export.xlsx</div>'
@@ -630,27 +1491,26 @@ def wykres():
                          default_nazwa=default_nazwa,
                          plot_html=plot_html)
 
-@app.route('/api/series')
-def api_series():
-    """Zwróć dane wszystkich serii dla wykresu kombinowanego w formacie JSON"""
-    # Pobierz kod maszyny z query string
-    kod = request.args.get('kod', '')
-    
-    df_long = load_long()
+def get_series_data(kod, fmt='full'):
+    """Dane wszystkich serii dla wykresu kombinowanego (słupki + linie)"""
+    with server_timing('series'):
+        if dataset.machine_version(kod) is None:
+            return build_series_data(kod, fmt)
+        return series_cache.get((kod, fmt), lambda: build_series_data(kod, fmt))
+
+def build_series_data(kod, fmt='full'):
+    """Zbuduj serie całego miesiąca dla maszyny z indeksu snapshotu"""
+    maszyna = dataset.index().get(kod) if kod else None
     
-    if df_long.empty or not kod:
-        return jsonify({
-            'series': [],
+    if maszyna is None:
+        return {
+            **(compact_series([]) if fmt == 'compact' else {'series': []}),
             'kod': kod,
             'nazwa': ''
-        })
-    
-    # Pobierz nazwę maszyny
-    maszyna_df = df_long[df_long['Kod'] == kod][['Nazwa']].drop_duplicates()
-    nazwa = maszyna_df.iloc[0]['Nazwa'] if not maszyna_df.empty else ''
+        }
     
     # Przygotuj dane dla wszystkich serii
-    series_data = []
+    entries = []
     
     # Kolory dla brygad
     kolory_slupki = {'A': '#0ea5e9', 'B': '#FF6B35', 'C': '#6b7280'}
@@ -658,42 +1518,174 @@ def api_series():
     
     # Słupki dla wartości dziennych (brygady A, B, C) - oś Y lewa
     for brygada in ['A', 'B', 'C']:
-        mask = (df_long['Typ'] == 'Dzienne') & (df_long['Kod'] == kod) & (df_long['Brygada'] == brygada)
-        filtered = df_long[mask].copy().sort_values('Dzien')
-        
-        if not filtered.empty:
-            series_data.append({
+        if ('Dzienne', brygada) in maszyna['series']:
+            days, values = maszyna['series'][('Dzienne', brygada)]
+            entries.append(({
                 'type': 'bar',
                 'name': brygada,
-                'x': filtered['Dzien'].tolist(),
-                'y': filtered['Wartosc'].tolist(),
                 'color': kolory_slupki.get(brygada, '#999999'),
                 'yaxis': 'y'
-            })
+            }, days, values))
     
     # Linie dla wartości narastających (brygady A, B, C) - oś Y prawa
     for brygada in ['A', 'B', 'C']:
-        mask = (df_long['Typ'] == 'Narastające') & (df_long['Kod'] == kod) & (df_long['Brygada'] == brygada)
-        filtered = df_long[mask].copy().sort_values('Dzien')
-        
-        if not filtered.empty:
-            series_data.append({
+        if ('Narastające', brygada) in maszyna['series']:
+            days, values = maszyna['series'][('Narastające', brygada)]
+            entries.append(({
                 'type': 'line',
                 'name': f'Narastająco {brygada}',
-                'x': filtered['Dzien'].tolist(),
-                'y': filtered['Wartosc'].tolist(),
                 'color': kolory_linie.get(brygada, '#666666'),
                 'yaxis': 'y2'
-            })
+            }, days, values))
     
-    return jsonify({
-        'series': series_data,
+    if fmt == 'compact':
+        series_data = compact_series(entries)
+    else:
+        series_data = {'series': [{**meta, 'x': x, 'y': y} for meta, x, y in entries]}
+    return {
+        **series_data,
         'kod': kod,
-        'nazwa': nazwa
-    })
+        'nazwa': maszyna['nazwa']
+    }
+
+def get_overview():
+    """Ranking wszystkich maszyn i brygad od początku miesiąca (cache na wersję danych)"""
+    with server_timing('overview'):
+        return overview_cache.get('all', lambda: build_overview(dataset.snapshot()))
+
+@app.route('/api/overview')
+def api_overview():
+    """Zwróć ranking maszyn: sumy od początku miesiąca i miejsca per brygada"""
+    return conditional_json(f'overview-{dataset.version}', get_overview)
+
+@app.route('/api/versions')
+def api_versions():
+    """Wersje danych per maszyna - zmieniają się tylko gdy zmieniły się wiersze maszyny"""
+    return jsonify(dataset.machine_versions())
+
+@app.route('/api/series')
+def api_series():
+    """Zwróć dane wszystkich serii dla wykresu kombinowanego w formacie JSON"""
+    # Pobierz kod maszyny z query string
+    kod = request.args.get('kod', '')
+    fmt = series_format()
+    etag = f'series-{kod}-{fmt}-{dataset.machine_version(kod)}'
+    return conditional_json(etag, lambda: get_series_data(kod, fmt))
+
+# Formaty eksportu strumieniowego - kolumny jak w imporcie (/api/ingest przyjmie plik CSV z powrotem)
+EXPORT_FORMATS = {'csv': 'text/csv; charset=utf-8', 'ndjson': 'application/x-ndjson'}
+EXPORT_FIELDS = [col.lower() for col in COLUMNS]
+
+def export_arg_values(name):
+    """Wartości filtra z query string (?kod=1310&kod=1334 lub ?kod=1310,1334)"""
+    values = []
+    for value in request.args.getlist(name):
+        values.extend(v.strip() for v in value.split(',') if v.strip())
+    return values
+
+def generate_export(snap, fmt, filters, start_day, end_day):
+    """Kolejne fragmenty eksportu - jeden blok wierszy snapshotu naraz"""
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow(EXPORT_FIELDS)
+        for block in iter_export_blocks(snap, filters, start_day, end_day):
+            writer.writerows(zip(*(block[col] for col in COLUMNS)))
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+    else:
+        for block in iter_export_blocks(snap, filters, start_day, end_day):
+            lines = [json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False)
+                     for row in zip(*(block[col] for col in COLUMNS))]
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+@app.route('/api/export')
+def api_export():
+    """
+    Eksport całego zbioru w formie długiej jako CSV lub NDJSON, przesyłany strumieniowo.
+    Filtry: kod, typ, brygada (wiele wartości), start_day, end_day; format=csv|ndjson.
+    """
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"Nieznany format '{fmt}' - dostępne: {', '.join(EXPORT_FORMATS)}"}), 400
+    try:
+        start_day = int(request.args['start_day']) if 'start_day' in request.args else None
+        end_day = int(request.args['end_day']) if 'end_day' in request.args else None
+    except ValueError:
+        return jsonify({'error': 'start_day i end_day muszą być liczbami całkowitymi'}), 400
+    filters = {col: export_arg_values(col.lower()) for col in ('Kod', 'Typ', 'Brygada')}
+    filters = {col: values for col, values in filters.items() if values}
+    
+    # Snapshot ustalony na początku - cały eksport pochodzi z jednej wersji danych,
+    # nawet jeśli w trakcie przesyłania pojawi się nowy upload
+    snap = dataset.snapshot()
+    filename = f'export-v{snap.version}.{fmt}'
+    return Response(generate_export(snap, fmt, filters, start_day, end_day),
+                    content_type=EXPORT_FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename={filename}',
+                             'X-Dataset-Version': str(snap.version),
+                             'Cache-Control': 'no-cache'})
+
+# ==================== TRYB OFFLINE (SERVICE WORKER) ====================
+
+SERVICE_WORKER_FILE = os.path.join('static', 'js', 'sw.js')
+
+def shell_assets():
+    """Powłoka kiosku zapisywana przez service worker: strona, własne pliki i zbudowane biblioteki"""
+    assets = ['/', static_url('js/main.js'), static_url('css/style.css')]
+    assets.extend(url for url in map(vendor_url, ('tailwind', 'fonts', 'chartjs')) if url)
+    return assets
+
+def build_asset_manifest():
+    """
+    Manifest zasobów kiosku: powłoka, aktualne slajdy i migawki API pobierane przez main.js.
+    Wersja zmienia się ze zmianą plików powłoki, strony głównej lub listy slajdów
+    (dane API odświeżane są przy każdym zapytaniu, więc nie wchodzą do wersji).
+    """
+    # Klipy wideo nie są zapisywane w całości - tylko ich klatki podglądu
+    slides = [slide['url'] if slide['type'] == 'image' else slide['poster']
+              for slide in get_slide_images() if slide['type'] == 'image' or slide['poster']]
+    api = ['/api/config', '/api/content', '/api/machines', '/api/overview', '/api/inspirations', '/api/slides']
+    maszyny = get_machines_list()
+    if maszyny:
+        api.append(f"/api/chart-data?kod={quote(maszyny[0]['kod'])}&range=month&format=compact")
+    
+    shell = shell_assets()
+    signature = json.dumps([shell, str(file_signature(SERVICE_WORKER_FILE)),
+                            cached_page('index', render_index)['etag'], sorted(slides)])
+    return {
+        'version': hashlib.sha1(signature.encode('utf-8')).hexdigest()[:12],
+        'shell': shell,
+        'slides': slides,
+        'api': api
+    }
+
+@app.route('/asset-manifest.json')
+def asset_manifest():
+    """Manifest zasobów do zapisania przez service worker"""
+    response = jsonify(build_asset_manifest())
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.route('/sw.js')
+def service_worker():
+    """
+    Service worker z wersją manifestu - serwowany z katalogu głównego (zakres całej strony).
+    Przeglądarka porównuje plik bajt po bajcie, więc nowa wersja zasobów instaluje nowego workera.
+    """
+    with open(SERVICE_WORKER_FILE, 'r', encoding='utf-8') as f:
+        script = f.read().replace('__MANIFEST_VERSION__', build_asset_manifest()['version'])
+    response = Response(script, mimetype='application/javascript')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 # ==================== URUCHOMIENIE APLIKACJI ====================
 
+mark_startup('imports')
+
 if __name__ == '__main__':
     # Inicjalizuj bazę danych
     init_db()
@@ -701,14 +1693,27 @@ if __name__ == '__main__':
     # Utwórz folder na zdjęcia jeśli nie istnieje
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     
+    # Wyczyść metryki poprzedniego uruchomienia
+    metrics.reset_directory(METRICS_DIR)
+    
+    # Rozgrzej dane i cache zanim serwer zacznie przyjmować połączenia
+    warm_up()
+    
+    # Ustawienia serwera (config.json / zmienne KIOSK_*)
+    server = get_server_settings()
+    
     # Uruchom serwer produkcyjny Waitress
     print("=" * 60)
     print("🚀 Firmowy Kiosk - Aplikacja uruchomiona!")
     print("=" * 60)
-    print("📍 Adres lokalny: http://0.0.0.0:5000")
-    print("🔐 Panel admina: http://0.0.0.0:5000/admin")
+    print(f"📍 Adres lokalny: http://{server['host']}:{server['port']}")
+    print(f"🔐 Panel admina: http://{server['host']}:{server['port']}/admin")
     print("🔑 PIN administracyjny: 7456")
+    print(f"🧵 Wątki: {server['threads']} (wiele procesów: python serve.py)")
+    print_startup_report()
     print("=" * 60)
     
-    # Bind do 0.0.0.0:5000 dla Replit
-    serve(app, host='0.0.0.0', port=5000, threads=4)
+    # Jeden proces - dla wielu procesów użyj launchera serve.py
+    SERVER_THREADS.set(server['threads'])
+    serve(app, host=server['host'], port=server['port'], threads=server['threads'],
+          connection_limit=server['connection_limit'], backlog=server['backlog'])
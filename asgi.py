@@ -0,0 +1,570 @@
+# -*- coding: utf-8 -*-
+"""
+Firmowy Kiosk - opcjonalny punkt wejścia ASGI (asyncio)
+Trasy tylko do odczytu obsługiwane są bezpośrednio w pętli asyncio ze współdzielonego
+snapshotu danych; pozostałe (admin, zapis, strony HTML, pliki statyczne) trafiają
+do istniejącej aplikacji Flask uruchamianej w puli wątków.
+
+Uruchomienie: python asgi.py  (wymaga: pip install uvicorn)
+          lub: uvicorn asgi:application --host 0.0.0.0 --port 5000 --workers 4
+"""
+
+import os
+import sys
+import io
+import json
+import time
+import asyncio
+import threading
+import concurrent.futures
+from urllib.parse import parse_qs
+
+import app as kiosk
+import metrics
+
+# Co ile sekund SSE/long-poll sprawdzają wersję danych
+POLL_INTERVAL = 2
+# Maksymalny czas oczekiwania long-poll i odstęp komentarzy keep-alive SSE
+LONG_POLL_TIMEOUT = 25
+SSE_HEARTBEAT = 15
+# Co ile sekund wątek Flask czekający na miejsce w kolejce sprawdza, czy klient się nie rozłączył
+BRIDGE_PUT_TIMEOUT = 1
+
+
+# ==================== ODPOWIEDZI ====================
+
+async def send_body(send, status, body, content_type, headers=()):
+    """Wyślij kompletną odpowiedź HTTP"""
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', content_type.encode('latin-1')),
+            (b'content-length', str(len(body)).encode('latin-1')),
+            *headers
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def send_json(send, data, status=200):
+    """Wyślij odpowiedź JSON (ten sam format co jsonify we Flasku)"""
+    body = (kiosk.app.json.dumps(data) + '\n').encode('utf-8')
+    await send_body(send, status, body, 'application/json')
+
+
+def etag_matches(headers, etag):
+    """Czy klient ma już wersję etag (If-None-Match)"""
+    values = headers.get('if-none-match', '')
+    return values.strip() == '*' or f'"{etag}"' in [v.strip().removeprefix('W/') for v in values.split(',')]
+
+
+async def send_versioned_json(send, headers, etag, compute):
+    """Odpowiedź JSON z ETag wersji danych - 304 bez obliczeń, gdy klient ma aktualną wersję"""
+    etag_headers = [(b'etag', f'"{etag}"'.encode('latin-1')), (b'cache-control', b'no-cache')]
+    if etag_matches(headers, etag):
+        await send({'type': 'http.response.start', 'status': 304, 'headers': etag_headers})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+    body = (kiosk.app.json.dumps(await compute()) + '\n').encode('utf-8')
+    await send_body(send, 200, body, 'application/json', headers=etag_headers)
+
+
+# ==================== WERSJA DANYCH I CACHE ====================
+
+class DatasetWatcher:
+    """
+    Jedno zadanie na proces sprawdza wersje snapshotu i maszyn (w wątku - sprawdzenie
+    może wymagać parsowania Export.xlsx) i budzi oczekujących klientów SSE/long-poll.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.machines = {}
+        self.changed = []
+        self.task = None
+        self._changed = None
+
+    async def start(self):
+        if self.task is None:
+            self._changed = asyncio.Event()
+            self._update(await asyncio.to_thread(kiosk.dataset.machine_versions))
+            self.task = asyncio.create_task(self._run())
+
+    def _update(self, versions):
+        self.version = versions['dataset_version']
+        self.machines = versions['machines']
+        self.changed = versions['changed']
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(POLL_INTERVAL)
+            try:
+                versions = await asyncio.to_thread(kiosk.dataset.machine_versions)
+            except Exception as e:
+                print(f"Błąd sprawdzania wersji danych: {e}")
+                continue
+            if versions['dataset_version'] != self.version:
+                self._update(versions)
+                self._changed.set()
+                self._changed = asyncio.Event()
+
+    def machine_version(self, kod):
+        return self.machines.get(kod)
+
+    async def wait_changed(self, timeout):
+        """Czekaj na zmianę wersji - zwraca False po upływie timeout"""
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def wait_machine(self, kod, since, timeout):
+        """Czekaj aż wersja maszyny będzie różna od since - zmiany innych maszyn nie budzą klienta"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while str(self.machine_version(kod)) == since:
+            remaining = deadline - loop.time()
+            if remaining <= 0 or not await self.wait_changed(remaining):
+                return False
+        return True
+
+
+watcher = DatasetWatcher()
+
+
+class VersionedCache:
+    """
+    Cache gotowych odpowiedzi JSON - każdy wpis ważny dla swojej wersji danych
+    (maszyny lub całego snapshotu). Przechowuje zadania (futures) - równoczesne
+    chybienia czekają na jedno obliczenie. Klucze pochodzą z zapytań, więc liczba
+    wpisów jest ograniczona (przy przepełnieniu usuwany jest najstarszy).
+    """
+
+    def __init__(self, max_entries=4096):
+        self.entries = {}
+        self.max_entries = max_entries
+        self.stats = {'hits': 0, 'misses': 0, 'coalesced': 0}
+
+    async def get(self, key, compute, version, store=True):
+        """Wynik dla wersji version; store=False - oblicz bez zapisywania (np. nieznana maszyna)"""
+        if not store:
+            self.stats['misses'] += 1
+            return await asyncio.to_thread(compute)
+        entry = self.entries.get(key)
+        future = entry[1] if entry is not None and entry[0] == version else None
+        if future is None:
+            self.stats['misses'] += 1
+            future = asyncio.ensure_future(asyncio.to_thread(compute))
+            self.entries.pop(key, None)
+            if len(self.entries) >= self.max_entries:
+                self.entries.pop(next(iter(self.entries)))
+            self.entries[key] = (version, future)
+        elif future.done():
+            self.stats['hits'] += 1
+        else:
+            self.stats['coalesced'] += 1
+        try:
+            return await asyncio.shield(future)
+        except Exception:
+            # Nie zapamiętuj błędów - następne żądanie spróbuje ponownie
+            if self.entries.get(key, (None, None))[1] is future:
+                del self.entries[key]
+            raise
+
+
+dataset_cache = VersionedCache()
+
+
+@metrics.register_collector
+def collect_asgi_cache_metrics():
+    """Liczniki cache odpowiedzi ASGI"""
+    kiosk.CACHE_HITS.set_total(dataset_cache.stats['hits'], cache='asgi')
+    kiosk.CACHE_MISSES.set_total(dataset_cache.stats['misses'], cache='asgi')
+    kiosk.SINGLEFLIGHT_COALESCED.set_total(dataset_cache.stats['coalesced'], group='asgi')
+
+
+# ==================== TRASY TYLKO DO ODCZYTU ====================
+
+def query_arg(query, name, default=''):
+    values = query.get(name)
+    return values[0] if values else default
+
+
+def series_format(query):
+    """Format serii z ?format= (jak series_format w app.py)"""
+    fmt = query_arg(query, 'format', 'full')
+    return fmt if fmt in kiosk.SERIES_FORMATS else 'full'
+
+
+async def api_machines(query, headers, send):
+    def compute():
+        try:
+            return kiosk.get_machines_list()
+        except Exception as e:
+            print(f"Błąd pobierania listy maszyn: {e}")
+            return []
+    await send_json(send, await dataset_cache.get(('machines',), compute, watcher.version))
+
+
+async def api_series(query, headers, send):
+    kod = query_arg(query, 'kod')
+    fmt = series_format(query)
+    version = watcher.machine_version(kod)
+    await send_versioned_json(send, headers, f'series-{kod}-{fmt}-{version}', lambda: dataset_cache.get(
+        ('series', kod, fmt), lambda: kiosk.get_series_data(kod, fmt), version, store=version is not None))
+
+
+async def api_chart_data(query, headers, send):
+    kod = query_arg(query, 'kod', '1310')
+    try:
+        start_day = None if query_arg(query, 'range') == 'month' else int(query_arg(query, 'start_day', '1'))
+    except ValueError:
+        await send_json(send, {'error': 'Nieprawidłowy start_day'}, status=400)
+        return
+    fmt = series_format(query)
+    version = watcher.machine_version(kod)
+    etag = f"chart-{kod}-{'month' if start_day is None else start_day}-{fmt}-{version}"
+    await send_versioned_json(send, headers, etag, lambda: dataset_cache.get(
+        ('chart-data', kod, start_day, fmt),
+        lambda: kiosk.get_chart_data_for_machine(kod=kod, start_day=start_day, fmt=fmt), version,
+        store=version is not None and (start_day is None or 1 <= start_day <= 31)))
+
+
+async def api_overview(query, headers, send):
+    version = watcher.version
+    await send_versioned_json(send, headers, f'overview-{version}', lambda: dataset_cache.get(
+        ('overview',), kiosk.get_overview, version))
+
+
+async def api_versions(query, headers, send):
+    await send_json(send, {'dataset_version': watcher.version, 'machines': watcher.machines,
+                           'changed': watcher.changed})
+
+
+async def api_slides(query, headers, send):
+    await send_json(send, await asyncio.to_thread(kiosk.get_slide_images))
+
+
+async def api_content(query, headers, send):
+    """Gotowa odpowiedź /api/content ze wspólnego cache (jak get_content w app.py)"""
+    snapshot = await asyncio.to_thread(kiosk.get_content_snapshot)
+    use_gzip = 'gzip' in headers.get('accept-encoding', '')
+    etag = snapshot['etag'] + ('-gzip' if use_gzip else '')
+    response_headers = [(b'etag', f'"{etag}"'.encode('latin-1')), (b'cache-control', b'no-cache'),
+                        (b'vary', b'Accept-Encoding')]
+    if etag_matches(headers, etag):
+        await send({'type': 'http.response.start', 'status': 304, 'headers': response_headers})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+    if use_gzip:
+        response_headers.append((b'content-encoding', b'gzip'))
+    await send_body(send, 200, snapshot['gzip'] if use_gzip else snapshot['body'], 'application/json',
+                    headers=response_headers)
+
+
+async def api_poll(query, headers, send):
+    """
+    Long-poll: czekaj aż wersja danych będzie różna od ?since= (max LONG_POLL_TIMEOUT s).
+    Z ?kod= porównywana jest wersja tej maszyny - zmiany innych maszyn nie budzą klienta.
+    """
+    since = query_arg(query, 'since')
+    kod = query_arg(query, 'kod')
+    if kod:
+        await watcher.wait_machine(kod, since, LONG_POLL_TIMEOUT)
+        version = watcher.machine_version(kod)
+        await send_json(send, {'dataset_version': watcher.version, 'kod': kod,
+                               'machine_version': version, 'changed': str(version) != since})
+        return
+    if str(watcher.version) == since:
+        await watcher.wait_changed(LONG_POLL_TIMEOUT)
+    version = watcher.version
+    await send_json(send, {'dataset_version': version, 'changed': str(version) != since,
+                           'machines': watcher.changed})
+
+
+async def api_events(query, headers, send):
+    """
+    Server-Sent Events: zdarzenie 'dataset' (z listą zmienionych maszyn) przy każdej
+    zmianie wersji danych; z ?kod= zdarzenie 'machine' tylko gdy zmieni się ta maszyna.
+    """
+    kod = query_arg(query, 'kod')
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no')
+        ]
+    })
+    while True:
+        if kod:
+            since = str(watcher.machine_version(kod))
+            payload = json.dumps({'kod': kod, 'machine_version': watcher.machine_version(kod),
+                                  'dataset_version': watcher.version})
+            chunk = f'event: machine\ndata: {payload}\n\n'
+        else:
+            payload = json.dumps({'dataset_version': watcher.version, 'machines': watcher.changed})
+            chunk = f'event: dataset\ndata: {payload}\n\n'
+        await send({'type': 'http.response.body', 'body': chunk.encode('utf-8'), 'more_body': True})
+        # Komentarze keep-alive do czasu następnej zmiany wersji (danej maszyny)
+        while not (await watcher.wait_machine(kod, since, SSE_HEARTBEAT) if kod
+                   else await watcher.wait_changed(SSE_HEARTBEAT)):
+            await send({'type': 'http.response.body', 'body': b': keep-alive\n\n', 'more_body': True})
+
+
+async def api_metrics(query, headers, send):
+    body = (await asyncio.to_thread(metrics.render, kiosk.METRICS_DIR)).encode('utf-8')
+    await send_body(send, 200, body, 'text/plain; version=0.0.4; charset=utf-8')
+
+
+# Trasy czekające na zmianę danych - przerywane, gdy klient się rozłączy
+STREAMING_ROUTES = {'/api/poll', '/api/events'}
+
+READ_ROUTES = {
+    '/api/machines': api_machines,
+    '/api/series': api_series,
+    '/api/chart-data': api_chart_data,
+    '/api/overview': api_overview,
+    '/api/versions': api_versions,
+    '/api/slides': api_slides,
+    '/api/content': api_content,
+    '/api/poll': api_poll,
+    '/api/events': api_events,
+    '/metrics': api_metrics,
+}
+
+
+# ==================== MOST DO APLIKACJI FLASK (WSGI) ====================
+
+def build_environ(scope, body):
+    """Zbuduj środowisko WSGI z zakresu ASGI"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name == 'CONTENT_LENGTH':
+            environ['CONTENT_LENGTH'] = value
+        else:
+            key = f'HTTP_{name}'
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+class ClientDisconnected(Exception):
+    """Klient rozłączył się w trakcie odpowiedzi - wątek Flask przestaje ją generować"""
+
+
+async def call_flask(scope, receive, send):
+    """
+    Obsłuż żądanie aplikacją Flask w wątku, przesyłając odpowiedź strumieniowo.
+    Gdy wysyłka do klienta się nie uda (rozłączenie w trakcie eksportu lub pliku),
+    wątek dostaje ClientDisconnected przy następnym put() - nie blokuje puli wątków.
+    """
+    body = b''
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get('body', b'')
+        more_body = message.get('more_body', False)
+
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=8)
+    environ = build_environ(scope, body)
+    disconnected = threading.Event()
+
+    def put(item):
+        if disconnected.is_set():
+            raise ClientDisconnected()
+        future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        while True:
+            try:
+                return future.result(timeout=BRIDGE_PUT_TIMEOUT)
+            except concurrent.futures.TimeoutError:
+                if disconnected.is_set():
+                    future.cancel()
+                    raise ClientDisconnected()
+
+    def run():
+        def start_response(status, headers, exc_info=None):
+            put(('start', status, headers))
+            return lambda data: put(('body', data))
+        result = kiosk.app(environ, start_response)
+        try:
+            for chunk in result:
+                if chunk:
+                    put(('body', chunk))
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+            if not disconnected.is_set():
+                put(('end',))
+
+    worker = loop.run_in_executor(None, run)
+    started = False
+    try:
+        while True:
+            item = await queue.get()
+            if item[0] == 'start':
+                status, headers = item[1], item[2]
+                await send({
+                    'type': 'http.response.start',
+                    'status': int(status.split(' ', 1)[0]),
+                    'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+                })
+                started = True
+            elif item[0] == 'body':
+                await send({'type': 'http.response.body', 'body': item[1], 'more_body': True})
+            else:
+                break
+    finally:
+        # Zwolnij wątek czekający na miejsce w kolejce; kolejne put() zgłoszą ClientDisconnected
+        disconnected.set()
+        while not queue.empty():
+            queue.get_nowait()
+        try:
+            await worker
+        except ClientDisconnected:
+            pass
+    if started:
+        await send({'type': 'http.response.body', 'body': b''})
+
+
+# ==================== APLIKACJA ASGI ====================
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            kiosk.init_db()
+            os.makedirs(kiosk.app.config['UPLOAD_FOLDER'], exist_ok=True)
+            await asyncio.to_thread(kiosk.warm_up)
+            await watcher.start()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def measured(scope, handler, query, send):
+    """Obsłuż trasę odczytu z pomiarem czasu, statusu i rozmiaru (metryki /metrics)"""
+    route = scope['path']
+    response = {'status': 500, 'size': 0}
+    headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope.get('headers', [])}
+
+    async def send_measured(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+            elapsed = (time.perf_counter() - started) * 1000
+            message = dict(message, headers=[*message.get('headers', []),
+                                             (b'server-timing', f'total;dur={elapsed:.1f}'.encode('latin-1'))])
+        else:
+            response['size'] += len(message.get('body', b''))
+        await send(message)
+
+    started = time.perf_counter()
+    kiosk.HTTP_IN_FLIGHT.inc()
+    try:
+        await handler(query, headers, send_measured)
+    finally:
+        kiosk.HTTP_IN_FLIGHT.dec()
+        kiosk.HTTP_REQUESTS.inc(route=route, method=scope['method'], status=response['status'])
+        kiosk.HTTP_LATENCY.observe(time.perf_counter() - started, route=route)
+        kiosk.HTTP_RESPONSE_SIZE.observe(response['size'], route=route)
+
+
+async def wait_disconnect(receive):
+    """Czekaj na rozłączenie klienta (http.disconnect)"""
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+async def until_disconnect(receive, coro):
+    """
+    Obsłuż żądanie, przerywając je, gdy klient się rozłączy - zamknięta karta kiosku
+    nie zostawia wiszącej pętli SSE/long-poll ani zajętego miejsca w HTTP_IN_FLIGHT
+    (send do zamkniętego połączenia nie zawsze zgłasza błąd).
+    """
+    handler = asyncio.ensure_future(coro)
+    disconnect = asyncio.ensure_future(wait_disconnect(receive))
+    try:
+        await asyncio.wait({handler, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        disconnect.cancel()
+        if not handler.done():
+            handler.cancel()
+        try:
+            await handler
+        except asyncio.CancelledError:
+            pass
+
+
+async def application(scope, receive, send):
+    """Aplikacja ASGI: szybka ścieżka odczytu + Flask dla reszty"""
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+    if 'first_request' not in kiosk.startup_timings:
+        kiosk.mark_startup('first_request')
+
+    handler = READ_ROUTES.get(scope['path'])
+    if handler is not None and scope['method'] in ('GET', 'HEAD'):
+        # Serwer bez obsługi lifespan - uruchom obserwatora przy pierwszym żądaniu
+        await watcher.start()
+        metrics.start_flusher(kiosk.METRICS_DIR)
+        query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        if scope['path'] in STREAMING_ROUTES:
+            await until_disconnect(receive, measured(scope, handler, query, send))
+        else:
+            await measured(scope, handler, query, send)
+        return
+
+    await call_flask(scope, receive, send)
+
+
+if __name__ == '__main__':
+    try:
+        import uvicorn
+    except ImportError:
+        print("❌ Brak serwera ASGI - zainstaluj: pip install uvicorn")
+        sys.exit(1)
+
+    settings = kiosk.get_server_settings()
+    metrics.reset_directory(kiosk.METRICS_DIR)
+    print("=" * 60)
+    print("🚀 Firmowy Kiosk - serwer ASGI")
+    print(f"📍 Adres: http://{settings['host']}:{settings['port']}")
+    print(f"⚙️  Procesy: {settings['workers']}")
+    print("=" * 60)
+    uvicorn.run('asgi:application',
+                host=settings['host'],
+                port=settings['port'],
+                workers=settings['workers'],
+                backlog=settings['backlog'],
+                limit_concurrency=settings['connection_limit'])
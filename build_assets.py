@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+Firmowy Kiosk - budowanie lokalnych zasobów front-endu (bez CDN w przeglądarce)
+Tworzy w static/vendor/: arkusz Tailwind skompilowany tylko z klas użytych w szablonach
+i main.js, przypięte paczki Chart.js i plotly.js oraz czcionkę Roboto, a także
+assets.json (plik + skrót treści), z którego szablony budują wersjonowane adresy.
+
+Wymagany krok wdrożenia (static/vendor nie jest w repozytorium): uruchom raz, na
+komputerze z dostępem do internetu - potem katalog static/vendor skopiuj na serwer
+w sieci zakładowej. Bez niego app.py przy starcie buduje tylko plotly.js (z pakietu
+plotly, bez sieci), a pozostałe biblioteki strony ładują z CDN.
+
+Uruchomienie:
+    python build_assets.py
+    python build_assets.py --tailwind-cli /usr/local/bin/tailwindcss
+"""
+
+import os
+import re
+import sys
+import json
+import stat
+import hashlib
+import argparse
+import platform
+import subprocess
+import urllib.request
+
+VENDOR_DIR = os.path.join('static', 'vendor')
+MANIFEST_FILE = os.path.join(VENDOR_DIR, 'assets.json')
+
+# Przypięte wersje bibliotek
+CHART_JS_VERSION = '4.4.1'
+CHART_JS_URL = f'https://cdn.jsdelivr.net/npm/chart.js@{CHART_JS_VERSION}/dist/chart.umd.js'
+TAILWIND_VERSION = '3.4.17'
+TAILWIND_CLI_URL = 'https://github.com/tailwindlabs/tailwindcss/releases/download/v{version}/tailwindcss-{target}'
+FONTS_CSS_URL = 'https://fonts.googleapis.com/css2?family=Roboto:wght@300;400;500;700&display=swap'
+# Google Fonts zwraca woff2 tylko przeglądarkom, które go obsługują
+FONTS_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+
+# Pliki, z których Tailwind zbiera użyte klasy
+TAILWIND_CONTENT = ['./templates/**/*.html', './static/js/**/*.js']
+TAILWIND_CONFIG = """module.exports = {
+  content: %s,
+  darkMode: 'class',
+  theme: { extend: {} },
+  plugins: [],
+};
+"""
+TAILWIND_INPUT = "@tailwind base;\n@tailwind components;\n@tailwind utilities;\n"
+
+
+def download(url, headers=None):
+    """Pobierz zasób (bajty)"""
+    request = urllib.request.Request(url, headers={'User-Agent': 'firmowy-kiosk-build', **(headers or {})})
+    with urllib.request.urlopen(request, timeout=60) as response:
+        return response.read()
+
+
+def write_vendor(name, data):
+    """Zapisz plik w static/vendor (atomowo) i zwróć jego ścieżkę względem static/"""
+    path = os.path.join(VENDOR_DIR, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return os.path.relpath(path, 'static').replace(os.sep, '/')
+
+
+def tailwind_target():
+    """Nazwa pliku samodzielnego CLI Tailwind dla bieżącej platformy"""
+    machine = platform.machine().lower()
+    arch = 'arm64' if machine in ('arm64', 'aarch64') else 'armv7' if machine.startswith('arm') else 'x64'
+    if sys.platform.startswith('win'):
+        return f'windows-{arch}.exe'
+    if sys.platform == 'darwin':
+        return f'macos-{arch}'
+    return f'linux-{arch}'
+
+
+# ==================== ZASOBY ====================
+
+def build_chartjs(args):
+    return write_vendor('chart.umd.min.js', download(CHART_JS_URL)), CHART_JS_VERSION
+
+
+def build_plotly(args):
+    """plotly.js z zainstalowanego pakietu plotly - ta sama wersja, której używa build_figure_html"""
+    from plotly.offline import get_plotlyjs, get_plotlyjs_version
+
+    return write_vendor('plotly.min.js', get_plotlyjs().encode('utf-8')), get_plotlyjs_version()
+
+
+def build_fonts(args):
+    """Arkusz Google Fonts z plikami woff2 pobranymi lokalnie"""
+    css = download(FONTS_CSS_URL, headers={'User-Agent': FONTS_USER_AGENT}).decode('utf-8')
+
+    def localize(match):
+        url = match.group(1)
+        filename = 'roboto-' + hashlib.sha1(url.encode('utf-8')).hexdigest()[:12] + '.woff2'
+        write_vendor(os.path.join('fonts', filename), download(url))
+        return f'url(fonts/{filename})'
+
+    css = re.sub(r'url\((https://[^)]+\.woff2)\)', localize, css)
+    return write_vendor('roboto.css', css.encode('utf-8')), 'Roboto 300/400/500/700'
+
+
+def build_tailwind(args):
+    """Arkusz Tailwind (zminifikowany) tylko z klasami użytymi w szablonach i main.js"""
+    cli = args.tailwind_cli
+    if not cli:
+        cli = os.path.join(args.tools_dir, f'tailwindcss-{TAILWIND_VERSION}-{tailwind_target()}')
+        if not os.path.exists(cli):
+            os.makedirs(args.tools_dir, exist_ok=True)
+            with open(cli, 'wb') as f:
+                f.write(download(TAILWIND_CLI_URL.format(version=TAILWIND_VERSION, target=tailwind_target())))
+            os.chmod(cli, os.stat(cli).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+    os.makedirs(args.tools_dir, exist_ok=True)
+    config = os.path.join(args.tools_dir, 'tailwind.config.js')
+    source = os.path.join(args.tools_dir, 'tailwind.input.css')
+    with open(config, 'w', encoding='utf-8') as f:
+        f.write(TAILWIND_CONFIG % json.dumps([os.path.abspath(p).replace(os.sep, '/') for p in TAILWIND_CONTENT]))
+    with open(source, 'w', encoding='utf-8') as f:
+        f.write(TAILWIND_INPUT)
+
+    output = os.path.join(VENDOR_DIR, 'tailwind.min.css')
+    os.makedirs(VENDOR_DIR, exist_ok=True)
+    subprocess.run([cli, '-c', config, '-i', source, '-o', output, '--minify'], check=True)
+    return os.path.relpath(output, 'static').replace(os.sep, '/'), TAILWIND_VERSION
+
+
+BUILDERS = {
+    'tailwind': build_tailwind,
+    'fonts': build_fonts,
+    'chartjs': build_chartjs,
+    'plotly': build_plotly,
+}
+
+
+# ==================== MANIFEST ====================
+
+def file_hash(path):
+    """Krótki skrót treści pliku (parametr ?v= w adresie)"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def load_manifest():
+    try:
+        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def build(names, args=None):
+    """
+    Zbuduj zasoby names i dopisz je do assets.json (ścieżki względem katalogu aplikacji).
+    Zwraca listę zasobów, których nie udało się zbudować.
+    """
+    manifest = load_manifest()
+    failed = []
+    for name in names:
+        try:
+            path, version = BUILDERS[name](args)
+        except Exception as e:
+            print(f"❌ {name}: {e}")
+            failed.append(name)
+            continue
+        manifest[name] = {'file': path, 'hash': file_hash(os.path.join('static', path)), 'version': version}
+        print(f"✅ {name} {version}: static/{path}")
+
+    os.makedirs(VENDOR_DIR, exist_ok=True)
+    tmp_manifest = f'{MANIFEST_FILE}.{os.getpid()}.tmp'
+    with open(tmp_manifest, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_manifest, MANIFEST_FILE)
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Budowanie lokalnych zasobów front-endu (static/vendor)')
+    parser.add_argument('names', nargs='*', metavar='ZASÓB',
+                        help=f"zasoby do zbudowania (domyślnie wszystkie: {', '.join(BUILDERS)})")
+    parser.add_argument('--tailwind-cli', default=None,
+                        help='ścieżka do samodzielnego CLI Tailwind (domyślnie pobierane do --tools-dir)')
+    parser.add_argument('--tools-dir', default=os.path.join('cache', 'build'),
+                        help='katalog na narzędzia i pliki pośrednie')
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.names if name not in BUILDERS]
+    if unknown:
+        parser.error(f"nieznane zasoby: {', '.join(unknown)}")
+
+    # Ścieżki względem katalogu aplikacji (jak w app.py)
+    if args.tailwind_cli:
+        args.tailwind_cli = os.path.abspath(args.tailwind_cli)
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    failed = build(args.names or list(BUILDERS), args)
+    if failed:
+        print(f"⚠️  Niezbudowane: {', '.join(failed)} - szablony użyją dla nich CDN")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
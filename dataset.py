@@ -0,0 +1,824 @@
+# -*- coding: utf-8 -*-
+"""
+Firmowy Kiosk - współdzielony snapshot danych z Export.xlsx
+Dane są parsowane raz i zapisywane jako kolumnowy plik o stałej szerokości
+(słowniki dla tekstów, int16 dni, float32 wartości), mapowany w pamięci
+przez wszystkie procesy robocze serwera bez kopiowania.
+"""
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+
+import numpy as np
+
+from singleflight import SingleFlight
+
+try:
+    import fcntl
+except ImportError:  # Windows - brak blokad między procesami
+    fcntl = None
+
+# Kolumny formy długiej (kolejność jak w load_long)
+COLUMNS = ['Typ', 'Kod', 'Nazwa', 'Brygada', 'Dzien', 'Wartosc']
+TEXT_COLUMNS = ['Typ', 'Kod', 'Nazwa', 'Brygada']
+
+POINTER_NAME = 'current.json'
+LOCK_NAME = 'ingest.lock'
+
+# Format pliku snapshotu: MAGIC, długość nagłówka (uint32), nagłówek JSON,
+# a następnie kolumny o stałej szerokości wyrównane do ALIGN bajtów
+MAGIC = b'KIOSKDS1'
+ALIGN = 64
+DAY_DTYPE = np.dtype('<i2')
+VALUE_DTYPE = np.dtype('<f4')
+
+# Liczba wierszy na blok eksportu strumieniowego (/api/export)
+EXPORT_BLOCK_ROWS = 8192
+
+
+def code_dtype(size):
+    """Najwęższy typ całkowity dla kodów słownika o danym rozmiarze"""
+    if size <= 0xFF:
+        return np.dtype('u1')
+    if size <= 0xFFFF:
+        return np.dtype('<u2')
+    return np.dtype('<u4')
+
+
+def encode_column(values):
+    """Zakoduj kolumnę tekstową słownikowo - zwraca (słownik, kody)"""
+    values = np.asarray([str(v) for v in values], dtype=object)
+    if len(values) == 0:
+        return [], np.zeros(0, dtype='u1')
+    dictionary, codes = np.unique(values, return_inverse=True)
+    return [str(v) for v in dictionary], codes.astype(code_dtype(len(dictionary)))
+
+
+def widen_values(values):
+    """float32 -> float64 z najkrótszym zapisem (2456.4546 zamiast 2456.45458984375)"""
+    return np.asarray(values).astype(str).astype(np.float64)
+
+
+def _align(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def write_snapshot(path, df_long, version):
+    """Zapisz formę długą (DataFrame lub słownik kolumn) jako kolumnowy plik snapshotu"""
+    rows = len(df_long['Wartosc'])
+    dictionaries = {}
+    arrays = []
+    for col in TEXT_COLUMNS:
+        if isinstance(df_long[col], tuple):
+            # Kolumna już zakodowana słownikowo (słownik, kody) - np. z merge_rows
+            dictionaries[col], codes = df_long[col]
+        else:
+            dictionaries[col], codes = encode_column(df_long[col].tolist())
+        arrays.append((col, codes))
+    arrays.append(('Dzien', np.asarray(df_long['Dzien'], dtype=DAY_DTYPE)))
+    arrays.append(('Wartosc', np.asarray(df_long['Wartosc'], dtype=VALUE_DTYPE)))
+
+    # Nagłówek z przesunięciami kolumn (względem początku pliku) - przeliczany
+    # aż długość nagłówka i początek danych przestaną się zmieniać
+    prefix = len(MAGIC) + 4
+    data_start = _align(prefix)
+    while True:
+        header = {'version': version, 'rows': rows, 'dictionaries': dictionaries, 'columns': []}
+        offset = data_start
+        for name, array in arrays:
+            header['columns'].append({'name': name, 'dtype': array.dtype.str, 'offset': offset})
+            offset = _align(offset + array.nbytes)
+        header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+        if _align(prefix + len(header_bytes)) == data_start:
+            break
+        data_start = _align(prefix + len(header_bytes))
+    header_bytes += b' ' * (data_start - prefix - len(header_bytes))
+
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(np.uint32(len(header_bytes)).tobytes())
+        f.write(header_bytes)
+        for (name, array), column in zip(arrays, header['columns']):
+            f.write(b'\0' * (column['offset'] - f.tell()))
+            f.write(np.ascontiguousarray(array).tobytes())
+
+
+class ColumnarSnapshot:
+    """
+    Snapshot otwarty bez kopiowania: kolumny to widoki numpy na plik
+    mapowany w pamięci - strony są współdzielone przez wszystkie procesy.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f'Nieprawidłowy plik snapshotu: {path}')
+            header_len = int(np.frombuffer(f.read(4), dtype='<u4')[0])
+            header = json.loads(f.read(header_len).decode('utf-8'))
+        self.version = header['version']
+        self.rows = header['rows']
+        self.dictionaries = header['dictionaries']
+        self.columns = {}
+        # Pusty plik danych nie może być mapowany - wtedy kolumny są puste
+        mm = np.memmap(path, dtype=np.uint8, mode='r') if self.rows else None
+        for column in header['columns']:
+            dtype = np.dtype(column['dtype'])
+            if mm is None:
+                self.columns[column['name']] = np.zeros(0, dtype=dtype)
+            else:
+                start = column['offset']
+                self.columns[column['name']] = mm[start:start + self.rows * dtype.itemsize].view(dtype)
+
+    def codes(self, col):
+        """Kody słownikowe kolumny tekstowej"""
+        return self.columns[col]
+
+    def decode(self, col):
+        """Zdekoduj kolumnę tekstową do tablicy napisów"""
+        dictionary = np.asarray(self.dictionaries[col] or [''], dtype=object)
+        return dictionary[self.columns[col]]
+
+    def code_of(self, col, value):
+        """Kod wartości w słowniku kolumny (None jeśli brak)"""
+        try:
+            return self.dictionaries[col].index(value)
+        except ValueError:
+            return None
+
+
+class MachineIndex:
+    """
+    Indeks per maszyna zbudowany z kolumn snapshotu (tylko numpy, bez pandas):
+    kod -> nazwa oraz serie (Typ, Brygada) -> (dni, wartości) posortowane po dniu.
+    """
+
+    def __init__(self, snap):
+        self.version = snap.version
+        self.machines = {}
+        self.pairs = []
+        if snap.rows == 0:
+            return
+        kod = snap.codes('Kod')
+        typ = snap.codes('Typ')
+        brygada = snap.codes('Brygada')
+        nazwa = snap.codes('Nazwa')
+        dzien = snap.columns['Dzien']
+
+        kody = snap.dictionaries['Kod']
+        nazwy = snap.dictionaries['Nazwa']
+        typy = snap.dictionaries['Typ']
+        brygady = snap.dictionaries['Brygada']
+
+        # Nazwa maszyny = nazwa z pierwszego wiersza danego kodu
+        first_codes, first_rows = np.unique(kod, return_index=True)
+        for code, row in zip(first_codes.tolist(), first_rows.tolist()):
+            self.machines[kody[code]] = {'nazwa': nazwy[nazwa[row]], 'series': {}}
+
+        # Unikalne pary (kod, nazwa) posortowane po kodzie - dla listy maszyn
+        pairs = np.unique(kod.astype(np.int64) * len(nazwy) + nazwa)
+        self.pairs = [(kody[p // len(nazwy)], nazwy[p % len(nazwy)]) for p in pairs.tolist()]
+
+        # Jedno sortowanie (kod, typ, brygada, dzień) i podział na grupy
+        order = np.lexsort((dzien, brygada, typ, kod))
+        k, t, b = kod[order], typ[order], brygada[order]
+        change = np.flatnonzero((k[1:] != k[:-1]) | (t[1:] != t[:-1]) | (b[1:] != b[:-1])) + 1
+        starts = [0] + change.tolist()
+        ends = change.tolist() + [len(order)]
+        days = dzien[order].tolist()
+        values = widen_values(snap.columns['Wartosc'][order]).tolist()
+        for start, end in zip(starts, ends):
+            machine = self.machines[kody[k[start]]]
+            machine['series'][(typy[t[start]], brygady[b[start]])] = (days[start:end], values[start:end])
+
+    def get(self, kod):
+        """Dane maszyny lub None"""
+        return self.machines.get(kod)
+
+
+def dense_series(series):
+    """
+    Serie (dni, wartości) z indeksu maszyny na wspólnej osi dni: zwraca (oś, lista gęstych
+    tablic) z wartościami zaokrąglonymi do liczb całkowitych i None w dniach bez wartości.
+    """
+    if not series:
+        return [], []
+    axis = np.unique(np.concatenate([np.asarray(days, dtype=np.int64) for days, _ in series]))
+    dense = []
+    for days, values in series:
+        column = [None] * len(axis)
+        positions = np.searchsorted(axis, np.asarray(days, dtype=np.int64)).tolist()
+        for position, value in zip(positions, np.rint(np.asarray(values, dtype=np.float64)).astype(np.int64).tolist()):
+            column[position] = value
+        dense.append(column)
+    return axis.tolist(), dense
+
+
+def machine_hashes(snap):
+    """
+    Skrót danych każdej maszyny (wiersze posortowane po Typ, Brygada, Dzien) -
+    porównanie z poprzednim snapshotem pokazuje, które maszyny się zmieniły.
+    """
+    if snap.rows == 0:
+        return {}
+    kod = snap.codes('Kod')
+    typ = snap.codes('Typ')
+    brygada = snap.codes('Brygada')
+    dzien = snap.columns['Dzien']
+    order = np.lexsort((dzien, brygada, typ, kod))
+    k = kod[order]
+    starts = np.flatnonzero(np.append(True, k[1:] != k[:-1]))
+    ends = np.append(starts[1:], len(order))
+
+    text = {col: (np.asarray(snap.dictionaries[col], dtype=object), snap.codes(col)[order])
+            for col in ('Typ', 'Nazwa', 'Brygada')}
+    days = np.ascontiguousarray(dzien[order])
+    values = np.ascontiguousarray(snap.columns['Wartosc'][order])
+    hashes = {}
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        digest = hashlib.sha1()
+        for dictionary, codes in text.values():
+            digest.update('\x1f'.join(dictionary[codes[start:end]].tolist()).encode('utf-8'))
+            digest.update(b'\x1e')
+        digest.update(days[start:end].tobytes())
+        digest.update(values[start:end].tobytes())
+        hashes[snap.dictionaries['Kod'][k[start]]] = digest.hexdigest()[:16]
+    return hashes
+
+
+def _merge_codes(dictionary, codes, new_values, keep):
+    """
+    Kody kolumny tekstowej po dopisaniu wartości new_values i usunięciu wierszy (maska keep)
+    - słownik zostaje posortowany i bez nieużywanych wpisów, jak z encode_column.
+    """
+    merged = sorted(set(dictionary) | set(new_values))
+    index = {value: i for i, value in enumerate(merged)}
+    remap = np.asarray([index[value] for value in dictionary], dtype=np.int64)
+    all_codes = np.concatenate([remap[codes], np.asarray([index[v] for v in new_values], dtype=np.int64)])[keep]
+    used = np.bincount(all_codes, minlength=len(merged)) > 0
+    if not used.all():
+        all_codes = (np.cumsum(used) - 1)[all_codes]
+        merged = [value for value, u in zip(merged, used.tolist()) if u]
+    return merged, all_codes.astype(code_dtype(len(merged)))
+
+
+def merge_rows(snap, rows):
+    """
+    Nałóż paczkę wierszy (Typ, Kod, Brygada, Dzien, Wartosc[, Nazwa]) na snapshot.
+    Klucz wiersza to (Typ, Kod, Brygada, Dzien): istniejący jest nadpisywany,
+    nowy dopisywany, Wartosc=None usuwa wiersz. Dekodowane są tylko wiersze maszyn
+    z paczki - reszta snapshotu zostaje w kodach słownikowych (kolumny tekstowe
+    zwracane jako (słownik, kody) dla write_snapshot). Zwraca (kolumny, statystyki, zmienione kody).
+    """
+    rows_before = snap.rows
+    dictionaries = {col: list(snap.dictionaries[col]) if rows_before else [] for col in TEXT_COLUMNS}
+    codes = {col: snap.codes(col) for col in TEXT_COLUMNS}
+    values = np.array(snap.columns['Wartosc'], dtype=VALUE_DTYPE)
+
+    # Pozycje istniejących wierszy tylko dla maszyn z paczki
+    kody = {kod: code for code, kod in enumerate(dictionaries['Kod'])}
+    batch_codes = [kody[kod] for kod in {row['Kod'] for row in rows} if kod in kody]
+    affected = np.flatnonzero(np.isin(codes['Kod'], batch_codes))
+    positions = {}
+    names = {}
+    decoded = [np.asarray(dictionaries[col] or [''], dtype=object)[codes[col][affected]].tolist()
+               for col in ('Typ', 'Kod', 'Brygada', 'Nazwa')]
+    for position, typ, kod, brygada, nazwa, dzien in zip(affected.tolist(), *decoded,
+                                                          snap.columns['Dzien'][affected].tolist()):
+        positions[(typ, kod, brygada, dzien)] = position
+        names.setdefault(kod, nazwa)
+
+    stats = {'updated': 0, 'added': 0, 'removed': 0, 'unchanged': 0}
+    added = {col: [] for col in COLUMNS}
+    removed = set()
+    changed = set()
+    for row in rows:
+        key = (row['Typ'], row['Kod'], row['Brygada'], row['Dzien'])
+        position = positions.get(key)
+        if row['Wartosc'] is None:
+            if position is not None and position not in removed:
+                removed.add(position)
+                stats['removed'] += 1
+                changed.add(row['Kod'])
+            continue
+        if position is None or position in removed:
+            nazwa = row.get('Nazwa') or names.get(row['Kod'], '')
+            names.setdefault(row['Kod'], nazwa)
+            positions[key] = rows_before + len(added['Wartosc'])
+            for col, value in (('Typ', row['Typ']), ('Kod', row['Kod']), ('Nazwa', nazwa),
+                               ('Brygada', row['Brygada']), ('Dzien', row['Dzien']),
+                               ('Wartosc', row['Wartosc'])):
+                added[col].append(value)
+            stats['added'] += 1
+            changed.add(row['Kod'])
+            continue
+        if position >= rows_before:
+            current = added['Wartosc'][position - rows_before]
+        else:
+            current = widen_values(values[position:position + 1])[0]
+        if current != row['Wartosc']:
+            if position >= rows_before:
+                added['Wartosc'][position - rows_before] = row['Wartosc']
+            else:
+                values[position] = row['Wartosc']
+            stats['updated'] += 1
+            changed.add(row['Kod'])
+        else:
+            stats['unchanged'] += 1
+
+    keep = np.ones(rows_before + len(added['Wartosc']), dtype=bool)
+    keep[list(removed)] = False
+    columns = {col: _merge_codes(dictionaries[col], codes[col], added[col], keep) for col in TEXT_COLUMNS}
+    columns['Dzien'] = np.concatenate([snap.columns['Dzien'], np.asarray(added['Dzien'], dtype=DAY_DTYPE)])[keep]
+    columns['Wartosc'] = np.concatenate([values, np.asarray(added['Wartosc'], dtype=VALUE_DTYPE)])[keep]
+    return columns, stats, changed
+
+
+def rank_desc(values, present):
+    """Ranking malejący (1 = najwyższa wartość, remisy z tym samym miejscem) - None gdy brak danych"""
+    # Miejsce = 1 + liczba większych wartości: pozycja w posortowanej malejąco tablicy (O(n log n))
+    ranked = -np.where(present, values, -np.inf)
+    ranks = np.searchsorted(np.sort(ranked), ranked, side='left') + 1
+    return [int(r) if p else None for r, p in zip(ranks.tolist(), present.tolist())]
+
+
+def build_overview(snap, daily='Dzienne', cumulative='Narastające'):
+    """
+    Ranking wszystkich maszyn od początku miesiąca - jedno przejście wektorowe po
+    kolumnach snapshotu: sumy i liczba dni wartości dziennych per (kod, brygada)
+    przez bincount, ostatnia wartość narastająca per (kod, brygada) po jednym sortowaniu.
+    """
+    kody = snap.dictionaries['Kod']
+    brygady = snap.dictionaries['Brygada']
+    result = {'brigades': list(brygady), 'last_day': None, 'machines': []}
+    if snap.rows == 0:
+        return result
+
+    kod = snap.codes('Kod').astype(np.int64)
+    brygada = snap.codes('Brygada')
+    typ = snap.codes('Typ')
+    dzien = snap.columns['Dzien']
+    values = snap.columns['Wartosc'].astype(np.float64)
+    nazwy = snap.dictionaries['Nazwa']
+    nazwa = snap.codes('Nazwa')
+
+    groups = len(kody) * len(brygady)
+    group = kod * len(brygady) + brygada
+
+    # Sumy i liczba dni wartości dziennych
+    daily_code = snap.code_of('Typ', daily)
+    is_daily = typ == daily_code if daily_code is not None else np.zeros(snap.rows, dtype=bool)
+    totals = np.bincount(group[is_daily], weights=values[is_daily], minlength=groups)
+    days = np.bincount(group[is_daily], minlength=groups)
+
+    # Ostatnia (najpóźniejszy dzień) wartość narastająca
+    latest = np.full(groups, np.nan)
+    cumulative_code = snap.code_of('Typ', cumulative)
+    if cumulative_code is not None:
+        rows = np.flatnonzero(typ == cumulative_code)
+        order = rows[np.lexsort((dzien[rows], group[rows]))]
+        last = np.flatnonzero(np.append(group[order][1:] != group[order][:-1], True))
+        latest[group[order][last]] = values[order][last]
+
+    totals = totals.reshape(len(kody), len(brygady))
+    days = days.reshape(len(kody), len(brygady))
+    latest = latest.reshape(len(kody), len(brygady))
+    machine_totals = totals.sum(axis=1)
+    has_data = days.sum(axis=1) > 0
+
+    brigade_ranks = [rank_desc(totals[:, b], days[:, b] > 0) for b in range(len(brygady))]
+    machine_ranks = rank_desc(machine_totals, has_data)
+
+    # Nazwa maszyny = nazwa z pierwszego wiersza kodu (jak w MachineIndex)
+    first_codes, first_rows = np.unique(kod, return_index=True)
+    names = dict(zip(first_codes.tolist(), (nazwy[nazwa[r]] for r in first_rows.tolist())))
+
+    machines = []
+    for k in first_codes.tolist():
+        machines.append({
+            'kod': kody[k],
+            'nazwa': names[k],
+            'total': round(float(machine_totals[k]), 0),
+            'days': int(days[k].max()),
+            'rank': machine_ranks[k],
+            'brigades': {
+                brygady[b]: {
+                    'total': round(float(totals[k, b]), 0),
+                    'days': int(days[k, b]),
+                    'mtd': None if np.isnan(latest[k, b]) else round(float(latest[k, b]), 0),
+                    'rank': brigade_ranks[b][k]
+                }
+                for b in range(len(brygady))
+            }
+        })
+    machines.sort(key=lambda m: (m['rank'] is None, m['rank'] or 0, m['kod']))
+    result['machines'] = machines
+    result['last_day'] = int(dzien[is_daily].max()) if is_daily.any() else None
+    return result
+
+
+def iter_export_blocks(snap, filters=None, start_day=None, end_day=None, block_rows=EXPORT_BLOCK_ROWS):
+    """
+    Wiersze snapshotu w blokach po block_rows (słowniki list kolumn COLUMNS).
+    Filtry {kolumna tekstowa: lista wartości} porównują kody słownika na widokach
+    mapowanych w pamięci - pamięć zależy od rozmiaru bloku, nie od liczby wierszy.
+    """
+    wanted = {}
+    for col, values in (filters or {}).items():
+        codes = [c for c in (snap.code_of(col, v) for v in values) if c is not None]
+        if not codes:
+            return
+        wanted[col] = np.asarray(codes)
+
+    for start in range(0, snap.rows, block_rows):
+        stop = min(start + block_rows, snap.rows)
+        dzien = snap.columns['Dzien'][start:stop]
+        mask = np.ones(stop - start, dtype=bool)
+        for col, codes in wanted.items():
+            mask &= np.isin(snap.codes(col)[start:stop], codes)
+        if start_day is not None:
+            mask &= dzien >= start_day
+        if end_day is not None:
+            mask &= dzien <= end_day
+        rows = np.flatnonzero(mask) + start
+        if len(rows) == 0:
+            continue
+        block = {}
+        for col in TEXT_COLUMNS:
+            dictionary = snap.dictionaries[col]
+            block[col] = [dictionary[c] for c in snap.codes(col)[rows].tolist()]
+        block['Dzien'] = snap.columns['Dzien'][rows].tolist()
+        block['Wartosc'] = widen_values(snap.columns['Wartosc'][rows]).tolist()
+        yield block
+
+
+def file_signature(path):
+    """Sygnatura pliku (rozmiar, mtime) - None jeśli plik nie istnieje"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+class _IngestLock:
+    """Blokada plikowa - tylko jeden proces parsuje Export.xlsx naraz"""
+
+    def __init__(self, path):
+        self.path = path
+        self.handle = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self.handle = open(self.path, 'a')
+            fcntl.flock(self.handle, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self.handle is not None:
+            fcntl.flock(self.handle, fcntl.LOCK_UN)
+            self.handle.close()
+            self.handle = None
+
+
+class SharedDataset:
+    """
+    Snapshot danych współdzielony między procesami.
+    Wskaźnik current.json wskazuje aktualny plik snapshotu; każdy proces
+    sprawdza go przy odczycie (os.stat) i przeładowuje dane gdy się zmienił.
+    parse(path) zwraca (kolumny, raport) lub zgłasza wyjątek (z opcjonalnym
+    atrybutem report) - plik jest wtedy odrzucany, a dane zostają poprzednie.
+    """
+
+    def __init__(self, source_path, snapshot_dir, parse, empty):
+        self.source_path = source_path
+        self.snapshot_dir = snapshot_dir
+        self.parse = parse
+        self.empty = empty
+        self.pointer_path = os.path.join(snapshot_dir, POINTER_NAME)
+        # _lock chroni tylko podmianę stanu; ciężka praca (parsowanie, budowa
+        # indeksu i DataFrame) idzie przez single-flight - raz dla wszystkich wątków
+        self._lock = threading.Lock()
+        self._flight = SingleFlight('dataset')
+        self._pointer_stat = None
+        self._pointer = None
+        self._snapshot = None
+        self._frame = None
+        self._index = None
+
+    # ---------- wskaźnik i pliki snapshotu ----------
+
+    def _stat_pointer(self):
+        try:
+            st = os.stat(self.pointer_path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _read_pointer(self):
+        try:
+            with open(self.pointer_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_pointer(self, pointer):
+        tmp_pointer = self.pointer_path + '.tmp'
+        with open(tmp_pointer, 'w', encoding='utf-8') as f:
+            json.dump(pointer, f)
+        os.replace(tmp_pointer, self.pointer_path)
+
+    @staticmethod
+    def _is_current(pointer, source):
+        """Plik źródłowy o tej sygnaturze został już opublikowany albo odrzucony"""
+        return pointer is not None and (pointer.get('source') == source
+                                        or (pointer.get('rejected') or {}).get('source') == source)
+
+    def _publish(self, df_long, source, report=None, rejected=None):
+        """
+        Zapisz nowy snapshot i atomowo przestaw wskaźnik.
+        Skróty danych maszyn są porównywane z poprzednim snapshotem - wersja
+        maszyny (pointer['machines']) rośnie tylko gdy jej wiersze się zmieniły.
+        """
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        previous = self._read_pointer() or {}
+        version = previous.get('version', 0) + 1
+
+        filename = f'snapshot-{version}.kds'
+        tmp_path = os.path.join(self.snapshot_dir, filename + '.tmp')
+        write_snapshot(tmp_path, df_long, version)
+        hashes = machine_hashes(ColumnarSnapshot(tmp_path))
+        os.replace(tmp_path, os.path.join(self.snapshot_dir, filename))
+
+        old_hashes = previous.get('hashes', {})
+        old_versions = previous.get('machines', {})
+        machines = {
+            kod: old_versions[kod] if old_hashes.get(kod) == digest and kod in old_versions else version
+            for kod, digest in hashes.items()
+        }
+        changed = sorted(kod for kod in set(hashes) | set(old_hashes) if hashes.get(kod) != old_hashes.get(kod))
+
+        pointer = {'version': version, 'file': filename, 'source': source,
+                   'rows': len(df_long['Wartosc']), 'machines': machines, 'hashes': hashes,
+                   'changed': changed, 'report': report}
+        if rejected:
+            pointer['rejected'] = rejected
+        self._write_pointer(pointer)
+
+        self._cleanup(keep={filename, previous.get('file')})
+        return pointer
+
+    def _ingest(self, previous, source):
+        """
+        Sparsuj plik źródłowy i opublikuj snapshot. Odrzucony plik trafia do wskaźnika
+        (pointer['rejected']) - poprzedni snapshot zostaje, a żaden proces nie parsuje
+        tego pliku ponownie, dopóki się nie zmieni.
+        """
+        try:
+            columns, report = self.parse(self.source_path)
+        except Exception as e:
+            return self._reject(previous, source, e)
+        report['checked_at'] = time.time()
+        return self._publish(columns, source, report)
+
+    def _reject(self, previous, source, error):
+        """Zapisz we wskaźniku raport odrzuconego pliku, zostawiając poprzedni snapshot"""
+        report = getattr(error, 'report', None) or {'errors': [f'{type(error).__name__}: {error}'], 'warnings': []}
+        report['checked_at'] = time.time()
+        if previous is None:
+            previous = self._publish(self.empty(), None)
+        pointer = dict(previous, rejected={'source': source, 'report': report})
+        self._write_pointer(pointer)
+        return pointer
+
+    def _cleanup(self, keep):
+        """Usuń stare snapshoty (procesy z otwartym mmap zachowują swoje dane)"""
+        for name in os.listdir(self.snapshot_dir):
+            if name.startswith('snapshot-') and name not in keep:
+                try:
+                    os.remove(os.path.join(self.snapshot_dir, name))
+                except OSError:
+                    pass
+
+    def _load(self, pointer):
+        snapshot = ColumnarSnapshot(os.path.join(self.snapshot_dir, pointer['file']))
+        with self._lock:
+            self._snapshot = snapshot
+            self._pointer = pointer
+            self._frame = None
+            self._index = None
+
+    # ---------- API ----------
+
+    def refresh(self, force=False):
+        """
+        Upewnij się, że snapshot odpowiada plikowi źródłowemu.
+        Parsuje Export.xlsx tylko gdy plik się zmienił (lub force=True).
+        Równoczesne wywołania w procesie czekają na jedno odświeżenie.
+        """
+        return self._flight.do(('refresh', force), lambda: self._refresh(force))
+
+    def _refresh(self, force):
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        # Stat wskaźnika przed jego odczytem - późniejsza zmiana zostanie wykryta
+        pointer_stat = self._stat_pointer()
+        source = file_signature(self.source_path)
+        pointer = self._read_pointer()
+        if force or not self._is_current(pointer, source):
+            with _IngestLock(os.path.join(self.snapshot_dir, LOCK_NAME)):
+                # Inny proces mógł w międzyczasie opublikować snapshot (lub odrzucić plik)
+                pointer = self._read_pointer()
+                source = file_signature(self.source_path)
+                if force or not self._is_current(pointer, source):
+                    pointer = self._ingest(pointer, source)
+                pointer_stat = self._stat_pointer()
+        if self._pointer is None or self._pointer['version'] != pointer['version']:
+            self._load(pointer)
+        else:
+            # Ta sama wersja danych - zmienił się tylko raport (np. odrzucony plik)
+            with self._lock:
+                self._pointer = pointer
+        self._pointer_stat = pointer_stat
+        return pointer
+
+    def _ensure_current(self):
+        pointer = self._pointer
+        if pointer is None or self._stat_pointer() != self._pointer_stat \
+                or not self._is_current(pointer, file_signature(self.source_path)):
+            self.refresh()
+
+    def upload_path(self, suffix):
+        """Unikalny plik tymczasowy na upload (obok snapshotów) - równoczesne uploady się nie nadpisują"""
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(prefix='upload-', suffix=suffix, dir=self.snapshot_dir)
+        os.close(fd)
+        return path
+
+    def replace_source(self, path):
+        """
+        Sparsuj nowy plik (np. upload) i dopiero po jego przyjęciu podmień nim plik źródłowy.
+        Odrzucony plik jest usuwany - plik źródłowy i dane zostają poprzednie, a raport
+        trafia do pointer['rejected']. Zwraca (wskaźnik, czy plik przyjęto).
+        """
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        with _IngestLock(os.path.join(self.snapshot_dir, LOCK_NAME)):
+            previous = self._read_pointer()
+            try:
+                # parse może traktować brak pliku jak puste dane - brakujący lub pusty upload to odrzucenie
+                if not os.path.isfile(path) or os.path.getsize(path) == 0:
+                    raise FileNotFoundError(f'Brak lub pusty plik {path}')
+                columns, report = self.parse(path)
+            except Exception as e:
+                pointer = self._reject(previous, file_signature(path), e)
+                if os.path.exists(path):
+                    os.remove(path)
+                accepted = False
+            else:
+                # os.replace zachowuje rozmiar i mtime - sygnatura pasuje do opublikowanego snapshotu
+                os.replace(path, self.source_path)
+                report['checked_at'] = time.time()
+                pointer = self._publish(columns, file_signature(self.source_path), report)
+                accepted = True
+        self.refresh()
+        return pointer, accepted
+
+    def apply_batch(self, rows):
+        """
+        Dopisz/popraw wiersze bez ponownego parsowania Export.xlsx - nowy snapshot
+        powstaje z aktualnego, a wersja rośnie tylko dla zmienionych maszyn.
+        """
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        with _IngestLock(os.path.join(self.snapshot_dir, LOCK_NAME)):
+            # Najnowszy opublikowany snapshot (mógł go zapisać inny proces)
+            pointer = self._read_pointer()
+            source = file_signature(self.source_path)
+            if not self._is_current(pointer, source):
+                pointer = self._ingest(pointer, source)
+            snap = ColumnarSnapshot(os.path.join(self.snapshot_dir, pointer['file']))
+            columns, stats, changed = merge_rows(snap, rows)
+            if changed:
+                pointer = self._publish(columns, pointer['source'], pointer.get('report'), pointer.get('rejected'))
+        self.refresh()
+        return pointer, stats, sorted(changed)
+
+    def machine_versions(self):
+        """Wersje wszystkich maszyn i lista maszyn zmienionych przez ostatnią publikację"""
+        self._ensure_current()
+        pointer = self._pointer
+        return {
+            'dataset_version': pointer['version'],
+            'machines': pointer.get('machines', {}),
+            'changed': pointer.get('changed', [])
+        }
+
+    def ingest_report(self):
+        """Raport walidacji pliku, z którego pochodzą dane, i pliku odrzuconego po nim (lub None)"""
+        self._ensure_current()
+        pointer = self._pointer
+        return {
+            'dataset_version': pointer['version'],
+            'accepted': pointer.get('report'),
+            'rejected': pointer.get('rejected')
+        }
+
+    def machine_version(self, kod):
+        """Wersja danych maszyny - zmienia się tylko gdy zmieniły się jej wiersze (None = brak maszyny)"""
+        self._ensure_current()
+        return self._pointer.get('machines', {}).get(str(kod))
+
+    @property
+    def loaded_version(self):
+        """Wersja załadowanego snapshotu bez sprawdzania zmian (None przed pierwszym odczytem)"""
+        pointer = self._pointer
+        return pointer['version'] if pointer else None
+
+    @property
+    def version(self):
+        """Numer wersji aktualnego snapshotu"""
+        self._ensure_current()
+        return self._pointer['version']
+
+    def snapshot(self):
+        """Zwróć aktualny snapshot kolumnowy (widoki na plik mapowany w pamięci)"""
+        self._ensure_current()
+        return self._snapshot
+
+    def index(self):
+        """Zwróć indeks per maszyna dla aktualnego snapshotu (cache na wersję)"""
+        self._ensure_current()
+        with self._lock:
+            snap, index = self._snapshot, self._index
+        if index is not None and index.version == snap.version:
+            return index
+        index = self._flight.do(('index', snap.version), lambda: MachineIndex(snap))
+        with self._lock:
+            if self._snapshot is snap:
+                self._index = index
+        return index
+
+    def frame(self):
+        """
+        Zwróć DataFrame formy długiej dla aktualnego snapshotu (cache na wersję).
+        Kolumny tekstowe są typu category (kody słownika ze snapshotu),
+        Dzien to int16, Wartosc to float32 - maski porównują małe kody całkowite.
+        """
+        self._ensure_current()
+        with self._lock:
+            snap, cached = self._snapshot, self._frame
+        if cached is not None and cached[0] == snap.version:
+            return cached[1]
+        df = self._flight.do(('frame', snap.version), lambda: self._build_frame(snap))
+        with self._lock:
+            if self._snapshot is snap:
+                self._frame = (snap.version, df)
+        return df
+
+    def _build_frame(self, snap):
+        import pandas as pd
+
+        data = {}
+        for col in TEXT_COLUMNS:
+            data[col] = pd.Categorical.from_codes(
+                snap.codes(col).astype(np.int32, copy=False), categories=snap.dictionaries[col])
+        data['Dzien'] = snap.columns['Dzien']
+        data['Wartosc'] = snap.columns['Wartosc']
+        return pd.DataFrame(data, copy=False)
+
+    def memory_report(self):
+        """Zajętość pamięci: kolumny DataFrame oraz pliku snapshotu"""
+        import pandas as pd
+
+        df = self.frame()
+        with self._lock:
+            snap = self._snapshot
+            pointer = self._pointer
+        frame_columns = {}
+        for col in df.columns:
+            series = df[col]
+            entry = {'dtype': str(series.dtype), 'bytes': int(series.memory_usage(index=False, deep=True))}
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                entry['categories'] = len(series.cat.categories)
+                entry['codes_dtype'] = str(series.cat.codes.dtype)
+            frame_columns[col] = entry
+        snapshot_columns = {
+            col: {'dtype': str(array.dtype), 'bytes': int(array.nbytes)}
+            for col, array in snap.columns.items()
+        }
+        return {
+            'version': pointer['version'],
+            'rows': len(df),
+            'frame': {
+                'columns': frame_columns,
+                'index_bytes': int(df.index.memory_usage(deep=True)),
+                'total_bytes': int(df.memory_usage(index=True, deep=True).sum())
+            },
+            'snapshot': {
+                'file': pointer['file'],
+                'file_bytes': os.path.getsize(snap.path),
+                'columns': snapshot_columns
+            }
+        }
@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""
+Firmowy Kiosk - strumieniowe wczytywanie Export.xlsx
+Arkusze czytane są wiersz po wierszu (openpyxl read-only), a komórki z wartościami
+trafiają od razu do buforów kolumnowych formy długiej - bez szerokiego DataFrame
+i bez melt, więc pamięć rośnie z liczbą wierszy wyniku, a nie z rozmiarem skoroszytu.
+Przy okazji powstaje raport walidacji; plik bez danych do pokazania jest odrzucany (ExportError).
+"""
+
+import math
+from array import array
+
+import numpy as np
+
+# Arkusze czytane w pierwszej kolejności (jak dotychczas); bez nich - wszystkie arkusze z danymi
+PREFERRED_SHEETS = ('Eksport', 'Export')
+MIN_DAY = 1
+MAX_DAY = 31
+# Typy i brygady pokazywane przez kiosk - inne wartości trafiają do ostrzeżeń raportu
+KNOWN_TYPES = ('Dzienne', 'Narastające')
+KNOWN_BRIGADES = ('A', 'B', 'C')
+# Ile przykładowych błędnych komórek zapisać w raporcie
+MAX_SAMPLES = 20
+# Największa wartość zapisywalna w kolumnie float32 snapshotu
+MAX_VALUE = float(np.finfo(np.float32).max)
+
+
+class ExportError(ValueError):
+    """Export.xlsx odrzucony przez walidację - report opisuje przyczynę"""
+
+    def __init__(self, message, report):
+        super().__init__(message)
+        self.report = report
+
+
+class LongBuffers:
+    """Bufory kolumn formy długiej: teksty jako kody słownika, dni int16, wartości float32"""
+
+    TEXT = ('Typ', 'Kod', 'Nazwa', 'Brygada')
+
+    def __init__(self):
+        self.duplicates = 0
+        self.cross_sheet = 0
+        self.cross_sheet_samples = []
+        self.sheet_names = []
+        self.dictionaries = {col: {} for col in self.TEXT}
+        self.codes = {col: array('I') for col in self.TEXT}
+        self.days = array('h')
+        self.values = array('f')
+        self.sheets = array('H')
+
+    def start_sheet(self, name):
+        """Kolejne wartości pochodzą z arkusza name"""
+        self.sheet_names.append(name)
+
+    def code(self, col, value):
+        dictionary = self.dictionaries[col]
+        code = dictionary.get(value)
+        if code is None:
+            code = dictionary[value] = len(dictionary)
+        return code
+
+    def add(self, ids, day, value):
+        for col, code in zip(self.TEXT, ids):
+            self.codes[col].append(code)
+        self.days.append(day)
+        self.values.append(value)
+        self.sheets.append(max(len(self.sheet_names) - 1, 0))
+
+    def _last_occurrences(self, codes, days, sheets):
+        """
+        Pozycje wierszy bez powtórzeń (Typ, Kod, Brygada, Dzien) - wygrywa późniejszy wiersz.
+        Zwraca też pary pozycji (wcześniejsza, późniejsza) tego samego klucza z różnych arkuszy.
+        """
+        positions = np.arange(len(days))
+        order = np.lexsort((positions, days, codes['Brygada'], codes['Kod'], codes['Typ']))
+        keys = [codes['Typ'][order], codes['Kod'][order], codes['Brygada'][order], days[order]]
+        last = np.ones(len(order), dtype=bool)
+        last[:-1] = np.any([k[1:] != k[:-1] for k in keys], axis=0)
+        cross = np.flatnonzero(~last[:-1] & (sheets[order][1:] != sheets[order][:-1]))
+        return np.sort(order[last]), list(zip(order[cross].tolist(), order[cross + 1].tolist()))
+
+    def columns(self):
+        """Kolumny gotowe do zapisu snapshotu (teksty jako tablice napisów)"""
+        codes = {col: np.frombuffer(self.codes[col], dtype=np.uint32) if len(self.codes[col])
+                 else np.zeros(0, dtype=np.uint32) for col in self.TEXT}
+        days = np.frombuffer(self.days, dtype=np.int16) if len(self.days) else np.zeros(0, dtype=np.int16)
+        values = np.frombuffer(self.values, dtype=np.float32) if len(self.values) else np.zeros(0, dtype=np.float32)
+        sheets = np.frombuffer(self.sheets, dtype=np.uint16) if len(self.sheets) else np.zeros(0, dtype=np.uint16)
+        keep, cross = self._last_occurrences(codes, days, sheets) if len(days) else (np.zeros(0, dtype=np.intp), [])
+        # Powtórzenie w tym samym arkuszu to poprawka (wygrywa późniejszy wiersz), z innego arkusza - konflikt
+        self.duplicates = len(days) - len(keep) - len(cross)
+
+        result = {}
+        dictionaries = {}
+        for col in self.TEXT:
+            dictionary = dictionaries[col] = np.empty(len(self.dictionaries[col]), dtype=object)
+            for value, code in self.dictionaries[col].items():
+                dictionary[code] = value
+            result[col] = dictionary[codes[col][keep]]
+        self.cross_sheet = len(cross)
+        self.cross_sheet_samples = [
+            f"{dictionaries['Typ'][codes['Typ'][later]]}/{dictionaries['Kod'][codes['Kod'][later]]}/"
+            f"{dictionaries['Brygada'][codes['Brygada'][later]]} dzień {days[later]} "
+            f"({self.sheet_names[sheets[earlier]]}, {self.sheet_names[sheets[later]]})"
+            for earlier, later in cross[:MAX_SAMPLES]
+        ]
+        result['Dzien'] = days[keep]
+        result['Wartosc'] = values[keep]
+        return result
+
+
+def cell_text(value):
+    """Tekst komórki identyfikatora (1310 i 1310.0 -> '1310')"""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def is_storable(value):
+    """Skończona liczba mieszcząca się w float32 (NaN/inf zepsułyby JSON wykresów)"""
+    return math.isfinite(value) and abs(value) <= MAX_VALUE
+
+
+def _number(value):
+    """Wartość komórki jako liczba, None (pusta komórka) lub False (tekst, NaN/inf, poza zakresem float32)"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        if value != value:
+            return None
+        try:
+            value = float(value)
+        except OverflowError:
+            return False
+        return value if is_storable(value) else False
+    text = str(value).strip().replace(',', '.')
+    if not text:
+        return None
+    try:
+        value = float(text)
+    except (ValueError, OverflowError):
+        return False
+    return value if is_storable(value) else False
+
+
+def _cell(row_number, col):
+    """Adres komórki (A1) do raportu"""
+    from openpyxl.utils import get_column_letter
+    return f'{get_column_letter(col + 1)}{row_number}'
+
+
+def _header_day(value):
+    """Numer dnia z nagłówka: int, None (kolumna bez dnia) lub False (liczba spoza 1-31)"""
+    try:
+        day = int(float(value))
+    except (TypeError, ValueError):
+        return None
+    return day if MIN_DAY <= day <= MAX_DAY else False
+
+
+def new_report():
+    """Pusty raport walidacji"""
+    return {'sheets': [], 'skipped_sheets': [], 'layout': {}, 'days': [], 'rows': 0, 'values': 0,
+            'invalid_cells': 0, 'invalid_samples': [], 'duplicates': 0,
+            'cross_sheet_duplicates': 0, 'cross_sheet_samples': [],
+            'unknown_types': {}, 'unknown_brigades': {}, 'errors': [], 'warnings': []}
+
+
+def read_sheet(rows, buffers, report, name=''):
+    """
+    Przetwórz wiersze jednego arkusza. Pierwszy wiersz to nagłówek z numerami dni;
+    pusta pierwsza komórka nagłówka oznacza układ Typ, Kod, Brygada (bez nazwy),
+    w przeciwnym razie Typ, Kod, Nazwa, Brygada. Zwraca False dla arkusza bez dni.
+    """
+    header = next(rows, None)
+    if not header:
+        return False
+    if header[0] is None or str(header[0]).strip() == '' or str(header[0]).startswith('Unnamed'):
+        id_columns = (0, 1, None, 2)
+        first_day_col = 3
+        layout = 'Typ, Kod, Brygada'
+    else:
+        id_columns = (0, 1, 2, 3)
+        first_day_col = 4
+        layout = 'Typ, Kod, Nazwa, Brygada'
+    day_columns = []
+    seen_days = set()
+    for i, v in enumerate(header):
+        if i < first_day_col:
+            continue
+        day = _header_day(v)
+        if day is False:
+            report['warnings'].append(f'{name}!{_cell(1, i)}: dzień {v} spoza zakresu {MIN_DAY}-{MAX_DAY} - kolumna pominięta')
+        elif day is not None:
+            if day in seen_days:
+                report['warnings'].append(f'{name}!{_cell(1, i)}: powtórzony dzień {day} - wygrywa późniejsza kolumna')
+            seen_days.add(day)
+            day_columns.append((i, day))
+    if not day_columns:
+        return False
+    buffers.start_sheet(name)
+    report['layout'][name] = layout
+    report['days'] = sorted(seen_days | set(report['days']))
+
+    samples = report['invalid_samples']
+    unknown_types = report['unknown_types']
+    unknown_brigades = report['unknown_brigades']
+    for row_number, row in enumerate(rows, start=2):
+        if not row:
+            continue
+        ids = [cell_text(row[i]) if i is not None and i < len(row) else '' for i in id_columns]
+        if not ids[1]:
+            continue
+        codes = None
+        for i, day in day_columns:
+            if i >= len(row):
+                break
+            value = _number(row[i])
+            if value is None:
+                continue
+            if value is False:
+                report['invalid_cells'] += 1
+                if len(samples) < MAX_SAMPLES:
+                    samples.append(f'{name}!{_cell(row_number, i)}: {row[i]!r}')
+                continue
+            if codes is None:
+                codes = [buffers.code(col, v) for col, v in zip(LongBuffers.TEXT, ids)]
+            buffers.add(codes, day, value)
+            report['values'] += 1
+        if ids[0] not in KNOWN_TYPES:
+            unknown_types[ids[0]] = unknown_types.get(ids[0], 0) + 1
+        if ids[3] not in KNOWN_BRIGADES:
+            unknown_brigades[ids[3]] = unknown_brigades.get(ids[3], 0) + 1
+        report['rows'] += 1
+    return True
+
+
+def _finish_report(report):
+    """Uzupełnij listy błędów i ostrzeżeń na podstawie liczników"""
+    if not report['sheets']:
+        report['errors'].append(f'Brak arkusza z nagłówkiem dni {MIN_DAY}-{MAX_DAY} '
+                                f'(oczekiwano arkusza {" lub ".join(PREFERRED_SHEETS)})')
+    elif not report['values']:
+        report['errors'].append('Arkusz nie zawiera żadnych wartości liczbowych')
+    elif report['invalid_cells'] > report['values']:
+        report['errors'].append(f"Więcej komórek nieliczbowych ({report['invalid_cells']}) niż wartości "
+                                f"({report['values']}) - prawdopodobnie zły układ kolumn")
+    elif report['invalid_cells']:
+        report['warnings'].append(f"Pominięto {report['invalid_cells']} komórek z nieliczbową wartością")
+    if report['values'] and report['unknown_types']:
+        report['warnings'].append(f"Nieznane typy (nie pokazywane na wykresach): {', '.join(sorted(report['unknown_types']))}")
+    if report['values'] and report['unknown_brigades']:
+        report['warnings'].append(f"Nieznane brygady (nie pokazywane na wykresach): {', '.join(sorted(report['unknown_brigades']))}")
+    if report['cross_sheet_duplicates']:
+        report['errors'].append(f"Te same wiersze (Typ, Kod, Brygada, Dzień) w różnych arkuszach: "
+                                f"{report['cross_sheet_duplicates']} (np. {'; '.join(report['cross_sheet_samples'][:3])})"
+                                f" - nie wiadomo, która wartość jest prawidłowa")
+    if report['duplicates']:
+        report['warnings'].append(f"Powtórzone wiersze (Typ, Kod, Brygada, Dzień): {report['duplicates']} - wygrywa późniejszy")
+    return report
+
+
+def read_export(path):
+    """
+    Wczytaj i zwaliduj Export.xlsx strumieniowo do kolumn formy długiej.
+    Czyta arkusz Eksport/Export, a gdy go nie ma - wszystkie arkusze z nagłówkiem dni
+    (np. osobne linie produkcyjne); powtórzony (Typ, Kod, Brygada, Dzien) - wygrywa późniejszy wiersz,
+    a ten sam klucz w różnych arkuszach jest błędem walidacji.
+    Zwraca (kolumny, raport); plik nieczytelny lub bez danych - ExportError z raportem.
+    """
+    # openpyxl ładowany tylko przy parsowaniu (nie przy starcie serwera)
+    from openpyxl import load_workbook
+
+    buffers = LongBuffers()
+    report = new_report()
+    try:
+        workbook = load_workbook(path, read_only=True, data_only=True)
+    except FileNotFoundError:
+        raise
+    except Exception as e:
+        report['errors'].append(f'Nie można otworzyć skoroszytu: {type(e).__name__}: {e}')
+        raise ExportError(report['errors'][0], report) from e
+    try:
+        names = [name for name in PREFERRED_SHEETS if name in workbook.sheetnames][:1] or workbook.sheetnames
+        for name in names:
+            if read_sheet(workbook[name].iter_rows(values_only=True), buffers, report, name):
+                report['sheets'].append(name)
+            else:
+                report['skipped_sheets'].append(name)
+    except Exception as e:
+        report['errors'].append(f'Błąd odczytu arkusza: {type(e).__name__}: {e}')
+        raise ExportError(report['errors'][-1], report) from e
+    finally:
+        workbook.close()
+
+    columns = buffers.columns()
+    report['duplicates'] = buffers.duplicates
+    report['cross_sheet_duplicates'] = buffers.cross_sheet
+    report['cross_sheet_samples'] = buffers.cross_sheet_samples
+    _finish_report(report)
+    if report['errors']:
+        raise ExportError(report['errors'][0], report)
+    return columns, report
+
+
+def empty_columns():
+    """Puste kolumny formy długiej (brak pliku lub błąd odczytu)"""
+    columns = {col: np.empty(0, dtype=object) for col in LongBuffers.TEXT}
+    columns['Dzien'] = np.zeros(0, dtype=np.int16)
+    columns['Wartosc'] = np.zeros(0, dtype=np.float32)
+    return columns
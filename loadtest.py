@@ -0,0 +1,428 @@
+# -*- coding: utf-8 -*-
+"""
+Firmowy Kiosk - generator obciążenia symulujący flotę kiosków
+Każdy wirtualny kiosk odtwarza ruch z static/js/main.js: załadowanie strony i danych,
+rotacja sekcji co 30 s (pokaz slajdów pobiera obrazy), odświeżanie treści co 5 min
+(5 endpointów) oraz przeciąganie suwaka dni - okno wycinane lokalnie z danych całego miesiąca
+(--legacy-slider: starzy klienci, zapytanie /api/chart-data?start_day= na każdy dzień).
+Opcjonalnie admin wgrywa Export.xlsx w trakcie testu.
+
+Uruchomienie: python loadtest.py --kiosks 50 --duration 300
+          lub: python loadtest.py --url http://serwer:5000 --kiosks 200 --speed 10 --upload-every 60
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import heapq
+import random
+import argparse
+import threading
+import http.client
+from urllib.parse import urlsplit, quote
+from concurrent.futures import ThreadPoolExecutor
+
+# Wzorce ruchu z main.js (sekundy) - interwały domyślne, nadpisywane przez /api/config
+ROTATION_INTERVAL = 30
+REFRESH_INTERVAL = 5 * 60
+SLIDE_INTERVAL = 5
+SECTIONS = ['wykresy', 'ranking', 'inspiracje', 'zdjecia', 'o-nas']
+# Suwak dni w index.html (min=1, max=25) i odstęp zdarzeń 'input' podczas przeciągania
+SLIDER_MIN = 1
+SLIDER_MAX = 25
+SLIDER_STEP_INTERVAL = 0.03
+# Przeglądarka otwiera maksymalnie 6 połączeń do jednego hosta
+BROWSER_CONNECTIONS = 6
+REQUEST_TIMEOUT = 30
+
+
+# ==================== STATYSTYKI ====================
+
+class Recorder:
+    """Czasy odpowiedzi, statusy i błędy per endpoint"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.statuses = {}
+        self.errors = {}
+        self.started = time.perf_counter()
+
+    def record(self, endpoint, seconds, status):
+        with self._lock:
+            self.latencies.setdefault(endpoint, []).append(seconds)
+            codes = self.statuses.setdefault(endpoint, {})
+            codes[status] = codes.get(status, 0) + 1
+            if status == 'error' or int(status) >= 400:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def report(self):
+        """Podsumowanie: przepustowość, percentyle czasu odpowiedzi, odsetek błędów"""
+        elapsed = time.perf_counter() - self.started
+        with self._lock:
+            endpoints = {}
+            for endpoint, values in sorted(self.latencies.items()):
+                values = sorted(values)
+                endpoints[endpoint] = {
+                    'requests': len(values),
+                    'rps': round(len(values) / elapsed, 2),
+                    'p50_ms': round(percentile(values, 50) * 1000, 1),
+                    'p95_ms': round(percentile(values, 95) * 1000, 1),
+                    'p99_ms': round(percentile(values, 99) * 1000, 1),
+                    'max_ms': round(values[-1] * 1000, 1),
+                    'errors': self.errors.get(endpoint, 0),
+                    'statuses': {str(k): v for k, v in sorted(self.statuses[endpoint].items(), key=str)}
+                }
+            all_values = sorted(v for values in self.latencies.values() for v in values)
+        total = len(all_values)
+        errors = sum(e['errors'] for e in endpoints.values())
+        return {
+            'duration_s': round(elapsed, 1),
+            'requests': total,
+            'rps': round(total / elapsed, 2) if elapsed else 0,
+            'error_rate': round(errors / total, 4) if total else 0,
+            'p50_ms': round(percentile(all_values, 50) * 1000, 1),
+            'p95_ms': round(percentile(all_values, 95) * 1000, 1),
+            'p99_ms': round(percentile(all_values, 99) * 1000, 1),
+            'endpoints': endpoints
+        }
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+# ==================== KLIENT HTTP ====================
+
+class Browser:
+    """Pula połączeń keep-alive jednego kiosku (jak przeglądarka - max 6 naraz)"""
+
+    def __init__(self, base_url, recorder):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.https = parts.scheme == 'https'
+        self.recorder = recorder
+        self.cookie = None
+        self._idle = []
+        self._lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=BROWSER_CONNECTIONS)
+
+    def _connection(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=REQUEST_TIMEOUT)
+
+    def request(self, method, path, body=None, headers=None, endpoint=None):
+        """Wykonaj żądanie i zapisz czas - zwraca (status, nagłówki, treść) lub None przy błędzie"""
+        endpoint = endpoint or path.split('?', 1)[0]
+        headers = dict(headers or {})
+        if self.cookie:
+            headers['Cookie'] = self.cookie
+        conn = self._connection()
+        start = time.perf_counter()
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self.recorder.record(endpoint, time.perf_counter() - start, 'error')
+            return None
+        self.recorder.record(endpoint, time.perf_counter() - start, response.status)
+        cookie = response.getheader('Set-Cookie')
+        if cookie:
+            self.cookie = cookie.split(';', 1)[0]
+        if response.will_close:
+            conn.close()
+        else:
+            with self._lock:
+                self._idle.append(conn)
+        return response.status, response, data
+
+    def fetch(self, path, endpoint=None):
+        """Żądanie w tle (jak fetch() bez await)"""
+        return self.pool.submit(self.request, 'GET', path, endpoint=endpoint)
+
+    def get(self, path, endpoint=None):
+        """Żądanie z oczekiwaniem na odpowiedź (jak await fetch())"""
+        return self.fetch(path, endpoint).result()
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+        with self._lock:
+            for conn in self._idle:
+                conn.close()
+            self._idle = []
+
+
+# ==================== WIRTUALNY KIOSK ====================
+
+class Kiosk(threading.Thread):
+    """Jeden ekran - odtwarza harmonogram żądań main.js"""
+
+    def __init__(self, number, args, recorder, stop_event):
+        super().__init__(name=f'kiosk-{number}', daemon=True)
+        self.args = args
+        self.browser = Browser(args.url, recorder)
+        self.stop_event = stop_event
+        self.random = random.Random(args.seed + number if args.seed is not None else None)
+        self.machine = '1310'
+        self.start_day = 1
+        self.rotation_interval = ROTATION_INTERVAL
+        self.refresh_interval = REFRESH_INTERVAL
+        self.slides = []
+        self.loaded_images = set()
+        self.section = 0
+
+    def scaled(self, seconds):
+        """Interwał main.js skrócony współczynnikiem --speed"""
+        return seconds / self.args.speed
+
+    def get_json(self, path):
+        result = self.browser.get(path)
+        if result is None or result[0] != 200:
+            return None
+        try:
+            return json.loads(result[2])
+        except ValueError:
+            return None
+
+    def load_config(self):
+        """Interwały rotacji i odświeżania z /api/config (jak loadConfig() w main.js)"""
+        config = self.get_json('/api/config') or {}
+        for key in ('rotation_interval', 'refresh_interval'):
+            try:
+                value = float(config.get(key, 0))
+            except (TypeError, ValueError):
+                continue
+            if value > 0:
+                setattr(self, key, value)
+
+    def load_chart_data(self, kod, start_day=None):
+        """Cały miesiąc maszyny (main.js) lub okno od start_day (starzy klienci)"""
+        if start_day is None:
+            return self.browser.fetch(f'/api/chart-data?kod={quote(kod)}&range=month&format=compact')
+        return self.browser.fetch(f'/api/chart-data?kod={quote(kod)}&start_day={start_day}')
+
+    def load_page(self):
+        """Wejście na / - HTML, zasoby statyczne i initializeApp()"""
+        result = self.browser.get('/')
+        if result is not None and result[0] == 200:
+            html = result[2].decode('utf-8', 'replace')
+            assets = set(re.findall(r'(?:src|href)="(/static/[^"]+)"', html))
+            for future in [self.browser.fetch(asset, endpoint='/static') for asset in assets]:
+                future.result()
+
+        self.load_config()
+        machines = self.get_json('/api/machines') or []
+        if machines:
+            self.machine = machines[0]['kod']
+            self.load_chart_data(self.machine, self.start_day if self.args.legacy_slider else None)
+        self.browser.get('/api/overview')
+        self.browser.get('/api/inspirations')
+        self.load_slides()
+        self.browser.get('/api/content')
+
+    def load_slides(self):
+        self.slides = self.get_json('/api/slides') or []
+
+    def refresh_content(self):
+        """refreshContent() co refresh_interval (konfiguracja, wykres, ranking, inspiracje, slajdy, treść)"""
+        self.load_config()
+        self.load_chart_data(self.machine, 1 if self.args.legacy_slider else None).result()
+        self.browser.get('/api/overview')
+        self.browser.get('/api/inspirations')
+        self.load_slides()
+        self.browser.get('/api/content')
+
+    def slider_storm(self):
+        """Przeciągnięcie suwaka - zdarzenie 'input' na każdy dzień po drodze (zapytanie tylko w --legacy-slider)"""
+        target = self.random.randint(SLIDER_MIN, SLIDER_MAX)
+        if not self.args.legacy_slider:
+            self.start_day = target
+            return
+        step = 1 if target >= self.start_day else -1
+        futures = []
+        for day in range(self.start_day + step, target + step, step):
+            if self.stop_event.is_set():
+                break
+            futures.append(self.load_chart_data(self.machine, day))
+            time.sleep(SLIDER_STEP_INTERVAL)
+        self.start_day = target
+        for future in futures:
+            future.result()
+
+    def show_slide(self, index):
+        """Pokaz slajdów - przeglądarka pobiera każdy obraz raz (potem z cache)"""
+        if not self.slides:
+            return
+        url = self.slides[index % len(self.slides)].get('url', '')
+        if url.startswith('/') and url not in self.loaded_images:
+            self.loaded_images.add(url)
+            self.browser.fetch(url, endpoint='/static/images')
+
+    def next_storm(self):
+        if self.args.storms_per_hour <= 0:
+            return None
+        return self.random.expovariate(self.args.storms_per_hour / 3600)
+
+    def run(self):
+        # Rozłożenie startu ekranów w czasie --ramp
+        if self.stop_event.wait(self.random.uniform(0, self.args.ramp)):
+            return
+        self.load_page()
+
+        now = time.monotonic()
+        events = [
+            (now + self.scaled(self.rotation_interval), 'rotate'),
+            (now + self.scaled(self.refresh_interval), 'refresh'),
+        ]
+        storm = self.next_storm()
+        if storm is not None:
+            events.append((now + storm, 'storm'))
+        heapq.heapify(events)
+
+        slide = 0
+        while not self.stop_event.is_set():
+            when, kind = heapq.heappop(events)
+            if self.stop_event.wait(max(0, when - time.monotonic())):
+                break
+            if kind == 'rotate':
+                self.section = (self.section + 1) % len(SECTIONS)
+                if SECTIONS[self.section] == 'zdjecia':
+                    slide = 0
+                    self.show_slide(slide)
+                    heapq.heappush(events, (when + self.scaled(SLIDE_INTERVAL), 'slide'))
+                heapq.heappush(events, (when + self.scaled(self.rotation_interval), 'rotate'))
+            elif kind == 'slide':
+                if SECTIONS[self.section] == 'zdjecia':
+                    slide += 1
+                    self.show_slide(slide)
+                    heapq.heappush(events, (when + self.scaled(SLIDE_INTERVAL), 'slide'))
+            elif kind == 'refresh':
+                self.refresh_content()
+                heapq.heappush(events, (when + self.scaled(self.refresh_interval), 'refresh'))
+            elif kind == 'storm':
+                self.slider_storm()
+                heapq.heappush(events, (time.monotonic() + self.next_storm(), 'storm'))
+        self.browser.close()
+
+
+# ==================== ADMIN (UPLOAD W TRAKCIE TESTU) ====================
+
+def multipart_body(field, filename, content):
+    boundary = f'----kiosk{random.getrandbits(64):016x}'
+    body = (
+        f'--{boundary}\r\n'
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        f'Content-Type: application/vnd.openxmlformats-officedocument.spreadsheetml.sheet\r\n\r\n'
+    ).encode('utf-8') + content + f'\r\n--{boundary}--\r\n'.encode('utf-8')
+    return body, f'multipart/form-data; boundary={boundary}'
+
+
+def run_uploader(args, recorder, stop_event):
+    """Co --upload-every sekund zaloguj się PIN-em i wgraj plik Excel"""
+    with open(args.upload_file, 'rb') as f:
+        content = f.read()
+    browser = Browser(args.url, recorder)
+    browser.request('POST', '/admin', body=f'pin={quote(args.pin)}',
+                    headers={'Content-Type': 'application/x-www-form-urlencoded'},
+                    endpoint='/admin [login]')
+    while not stop_event.wait(args.upload_every):
+        body, content_type = multipart_body('excel_file', os.path.basename(args.upload_file), content)
+        result = browser.request('POST', '/api/upload-excel', body=body,
+                                 headers={'Content-Type': content_type})
+        status = result[0] if result else 'błąd połączenia'
+        print(f"📤 Upload {os.path.basename(args.upload_file)}: {status}")
+    browser.close()
+
+
+# ==================== URUCHOMIENIE ====================
+
+def print_report(report, args):
+    print("=" * 78)
+    print(f"📊 Wynik: {args.kiosks} kiosków, {report['duration_s']} s (przyspieszenie ×{args.speed})")
+    print(f"   Żądania: {report['requests']}, przepustowość: {report['rps']} req/s, "
+          f"błędy: {report['error_rate'] * 100:.2f}%")
+    print(f"   Czas odpowiedzi: p50 {report['p50_ms']} ms, p95 {report['p95_ms']} ms, p99 {report['p99_ms']} ms")
+    print("-" * 78)
+    print(f"{'Endpoint':<24}{'żądania':>9}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}{'błędy':>7}")
+    for endpoint, stats in report['endpoints'].items():
+        print(f"{endpoint:<24}{stats['requests']:>9}{stats['rps']:>9}{stats['p50_ms']:>9}"
+              f"{stats['p95_ms']:>9}{stats['p99_ms']:>9}{stats['max_ms']:>9}{stats['errors']:>7}")
+    print("=" * 78)
+
+
+def parse_args(argv=None):
+    config = {}
+    if os.path.exists('config.json'):
+        with open('config.json', 'r', encoding='utf-8') as f:
+            config = json.load(f)
+
+    parser = argparse.ArgumentParser(description='Symulacja floty kiosków (ruch jak w static/js/main.js)')
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='adres serwera kiosku')
+    parser.add_argument('--kiosks', type=int, default=20, help='liczba symulowanych ekranów')
+    parser.add_argument('--duration', type=float, default=120, help='czas testu w sekundach')
+    parser.add_argument('--speed', type=float, default=1,
+                        help='przyspieszenie harmonogramu main.js (10 = odświeżanie co 30 s zamiast 5 min)')
+    parser.add_argument('--ramp', type=float, default=10,
+                        help='czas rozłożenia startu ekranów (0 = wszystkie naraz, np. po zaniku prądu)')
+    parser.add_argument('--storms-per-hour', type=float, default=2,
+                        help='średnia liczba przeciągnięć suwaka dni na ekran na godzinę')
+    parser.add_argument('--legacy-slider', action='store_true',
+                        help='suwak jak w starym main.js - zapytanie /api/chart-data?start_day= na każdy dzień')
+    parser.add_argument('--upload-every', type=float, default=0,
+                        help='co ile sekund admin wgrywa Excel (0 = bez uploadu)')
+    parser.add_argument('--upload-file', default='Export.xlsx', help='plik wgrywany przez admina')
+    parser.add_argument('--pin', default=config.get('admin_pin', ''), help='PIN admina (domyślnie z config.json)')
+    parser.add_argument('--seed', type=int, default=None, help='ziarno losowania (powtarzalne testy)')
+    parser.add_argument('--json', dest='json_path', default=None, help='zapisz wynik do pliku JSON')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.speed <= 0:
+        print("❌ --speed musi być większe od zera")
+        return 1
+    if args.upload_every and not os.path.exists(args.upload_file):
+        print(f"❌ Brak pliku do uploadu: {args.upload_file}")
+        return 1
+
+    recorder = Recorder()
+    stop_event = threading.Event()
+    threads = [Kiosk(i, args, recorder, stop_event) for i in range(args.kiosks)]
+    if args.upload_every:
+        threads.append(threading.Thread(target=run_uploader, args=(args, recorder, stop_event),
+                                        name='admin', daemon=True))
+
+    print(f"🚀 Symulacja {args.kiosks} kiosków → {args.url} przez {args.duration:.0f} s "
+          f"(×{args.speed}, start w {args.ramp:.0f} s)")
+    for thread in threads:
+        thread.start()
+    try:
+        stop_event.wait(args.duration)
+    except KeyboardInterrupt:
+        print("⏹️  Przerwano - podsumowanie dotychczasowych wyników")
+    stop_event.set()
+    for thread in threads:
+        thread.join(timeout=REQUEST_TIMEOUT)
+
+    report = recorder.report()
+    print_report(report, args)
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""
+Firmowy Kiosk - metryki w formacie tekstowym Prometheus (/metrics)
+Liczniki, wskaźniki i histogramy bez zewnętrznych zależności. Przy wielu procesach
+każdy proces okresowo zapisuje swoje metryki do METRICS_DIR, a /metrics sumuje je
+(wskaźniki typu gauge są raportowane osobno z etykietą pid).
+"""
+
+import os
+import json
+import math
+import time
+import threading
+
+import singleflight
+
+# Przedziały histogramów: czas (sekundy) i rozmiar (bajty)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# Co ile sekund proces zapisuje swoje metryki dla pozostałych procesów
+FLUSH_INTERVAL = 5
+
+METRICS = {}
+_collectors = []
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+        METRICS[name] = self
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def dump(self):
+        with self._lock:
+            return [[list(key), value if not isinstance(value, list) else list(value)]
+                    for key, value in self._values.items()]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set_total(self, value, **labels):
+        """Ustaw wartość licznika z zewnętrznej sumy (np. statystyk cache)"""
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            # [liczniki przedziałów..., suma, liczba]
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[i] += 1
+                    break
+            data[-2] += value
+            data[-1] += 1
+
+    def time(self, **labels):
+        """Menedżer kontekstu mierzący czas bloku"""
+        return _Timer(self, labels)
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+def register_collector(func):
+    """Funkcja wywoływana przed zebraniem metryk (aktualizuje wartości z innych źródeł)"""
+    _collectors.append(func)
+    return func
+
+
+def collect():
+    """Zrzut metryk bieżącego procesu"""
+    for func in _collectors:
+        try:
+            func()
+        except Exception as e:
+            print(f"Błąd kolektora metryk: {e}")
+    return {
+        name: {
+            'kind': metric.kind,
+            'help': metric.help,
+            'labels': list(metric.labelnames),
+            'buckets': list(getattr(metric, 'buckets', ())),
+            'values': metric.dump()
+        }
+        for name, metric in METRICS.items()
+    }
+
+
+# ==================== WIELE PROCESÓW ====================
+
+_flusher = {'pid': None}
+
+
+def reset_directory(directory):
+    """Wyczyść metryki poprzedniego uruchomienia serwera"""
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.endswith('.json'):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+def after_fork():
+    """
+    Wyzeruj liczniki i histogramy odziedziczone po procesie nadrzędnym (są w jego pliku)
+    - także statystyki cache i single-flight, z których kolektory przepisują liczniki.
+    """
+    singleflight.reset_stats()
+    for metric in METRICS.values():
+        if metric.kind != 'gauge':
+            with metric._lock:
+                metric._values = {}
+
+
+def flush(directory):
+    """Zapisz metryki bieżącego procesu do pliku <pid>.json"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{os.getpid()}.json')
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(collect(), f)
+    os.replace(path + '.tmp', path)
+
+
+def start_flusher(directory):
+    """Uruchom wątek zapisujący metryki (raz na proces - także po fork)"""
+    if _flusher['pid'] == os.getpid():
+        return
+    _flusher['pid'] = os.getpid()
+
+    def run():
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            try:
+                flush(directory)
+            except OSError as e:
+                print(f"Błąd zapisu metryk: {e}")
+
+    threading.Thread(target=run, name='metrics-flusher', daemon=True).start()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _read_other_processes(directory):
+    """Metryki pozostałych procesów (tylko POSIX - na Windows jest jeden proces)"""
+    if os.name == 'nt' or not os.path.isdir(directory):
+        return {}
+    result = {}
+    for name in os.listdir(directory):
+        if not name.endswith('.json'):
+            continue
+        try:
+            pid = int(name[:-5])
+        except ValueError:
+            continue
+        if pid == os.getpid():
+            continue
+        try:
+            with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+                result[pid] = (json.load(f), _pid_alive(pid))
+        except (OSError, ValueError):
+            pass
+    return result
+
+
+# ==================== FORMAT PROMETHEUS ====================
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def render(directory=None):
+    """Metryki wszystkich procesów w formacie tekstowym Prometheus"""
+    own = collect()
+    sources = [(os.getpid(), own, True)]
+    if directory:
+        flush(directory)
+        sources += [(pid, data, alive) for pid, (data, alive) in _read_other_processes(directory).items()]
+
+    lines = []
+    for name, meta in own.items():
+        lines.append(f'# HELP {name} {meta["help"]}')
+        lines.append(f'# TYPE {name} {meta["kind"]}')
+        labelnames = meta['labels']
+
+        if meta['kind'] == 'gauge':
+            # Wskaźniki osobno dla każdego żyjącego procesu
+            for pid, data, alive in sources:
+                if not alive or name not in data:
+                    continue
+                for key, value in data[name]['values']:
+                    lines.append(f'{name}{_labels(labelnames, key, [("pid", pid)])} {_number(value)}')
+            continue
+
+        # Liczniki i histogramy sumowane po procesach (także zakończonych)
+        merged = {}
+        for pid, data, alive in sources:
+            if name not in data:
+                continue
+            for key, value in data[name]['values']:
+                key = tuple(key)
+                if meta['kind'] == 'counter':
+                    merged[key] = merged.get(key, 0) + value
+                else:
+                    current = merged.setdefault(key, [0] * len(value))
+                    merged[key] = [a + b for a, b in zip(current, value)]
+
+        for key, value in sorted(merged.items()):
+            if meta['kind'] == 'counter':
+                lines.append(f'{name}{_labels(labelnames, key)} {_number(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(meta['buckets'], value):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(labelnames, key, [("le", _number(bound))])} {cumulative}')
+            lines.append(f'{name}_bucket{_labels(labelnames, key, [("le", "+Inf")])} {value[-1]}')
+            lines.append(f'{name}_sum{_labels(labelnames, key)} {_number(value[-2])}')
+            lines.append(f'{name}_count{_labels(labelnames, key)} {value[-1]}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Firmowy Kiosk - produkcyjny launcher (procesy × wątki Waitress)
+Uruchomienie: python serve.py
+Ustawienia: sekcja "server" w config.json lub zmienne KIOSK_WORKERS, KIOSK_THREADS,
+KIOSK_CONNECTION_LIMIT, KIOSK_BACKLOG, KIOSK_HOST, KIOSK_PORT
+"""
+
+import os
+import sys
+import signal
+import socket
+import time
+
+from waitress import serve
+
+import app as kiosk
+import metrics
+
+
+def bind_socket(host, port):
+    """Utwórz gniazdo nasłuchujące współdzielone przez procesy robocze"""
+    family, socktype, proto, _, sockaddr = socket.getaddrinfo(
+        host, port, socket.AF_UNSPEC, socket.SOCK_STREAM)[0]
+    sock = socket.socket(family, socktype, proto)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(sockaddr)
+    return sock
+
+
+def run_worker(sock, settings):
+    """Proces roboczy - Waitress na współdzielonym gnieździe"""
+    kiosk.SERVER_THREADS.set(settings['threads'])
+    serve(kiosk.app,
+          sockets=[sock],
+          threads=settings['threads'],
+          connection_limit=settings['connection_limit'],
+          backlog=settings['backlog'])
+
+
+def spawn_worker(sock, settings):
+    """Uruchom proces roboczy (fork) i zwróć jego PID"""
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        metrics.after_fork()
+        try:
+            run_worker(sock, settings)
+        finally:
+            os._exit(0)
+    return pid
+
+
+def main():
+    settings = kiosk.get_server_settings()
+
+    # Inicjalizacja wspólna dla wszystkich procesów
+    kiosk.init_db()
+    os.makedirs(kiosk.app.config['UPLOAD_FOLDER'], exist_ok=True)
+    metrics.reset_directory(kiosk.METRICS_DIR)
+
+    # Rozgrzewka przed otwarciem portu: Export.xlsx parsowany raz, indeks, wykres
+    # domyślny i cache - procesy robocze dziedziczą je po fork()
+    kiosk.warm_up()
+    pointer = kiosk.dataset.refresh()
+
+    sock = bind_socket(settings['host'], settings['port'])
+    workers = max(1, settings['workers'])
+
+    print("=" * 60)
+    print("🚀 Firmowy Kiosk - serwer produkcyjny")
+    print("=" * 60)
+    print(f"📍 Adres: http://{settings['host']}:{settings['port']}")
+    print(f"⚙️  Procesy: {workers} × wątki: {settings['threads']}")
+    print(f"🔗 Limit połączeń: {settings['connection_limit']}, backlog: {settings['backlog']}")
+    print(f"📊 Snapshot danych: wersja {pointer['version']} ({pointer['rows']} wierszy)")
+    kiosk.print_startup_report()
+    print("=" * 60)
+
+    if workers == 1 or not hasattr(os, 'fork'):
+        if workers > 1:
+            print("⚠️  Brak os.fork() (Windows) - uruchamiam jeden proces")
+        run_worker(sock, settings)
+        return
+
+    children = set()
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    # Metryki rozgrzewki (parsowanie Excela) zapisuje proces nadrzędny
+    metrics.flush(kiosk.METRICS_DIR)
+    for _ in range(workers):
+        children.add(spawn_worker(sock, settings))
+
+    # Nadzoruj procesy robocze - uruchom ponownie te, które się zakończyły
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        children.discard(pid)
+        if not stopping:
+            print(f"⚠️  Proces roboczy {pid} zakończył się (status {status}) - restart")
+            time.sleep(1)
+            children.add(spawn_worker(sock, settings))
+
+    sock.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
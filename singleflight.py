@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Firmowy Kiosk - łączenie równoczesnych obliczeń (single-flight) i cache per wersja danych
+Gdy wiele wątków jednocześnie potrzebuje tego samego wyniku (np. po uploadzie nowego
+Export.xlsx), liczy go tylko pierwszy - pozostałe czekają i dostają ten sam wynik.
+"""
+
+import threading
+
+# Wszystkie grupy single-flight i cache - dla raportów /api/debug/cache i /metrics
+FLIGHTS = {}
+CACHES = {}
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Grupa single-flight: jedno obliczenie w toku na klucz"""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = {'calls': 0, 'executions': 0, 'coalesced': 0, 'errors': 0}
+        FLIGHTS[name] = self
+
+    def do(self, key, func):
+        """Wykonaj func() dla klucza lub dołącz do obliczenia już trwającego"""
+        with self._lock:
+            self.stats['calls'] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats['executions'] += 1
+            else:
+                self.stats['coalesced'] += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self.stats['errors'] += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result
+
+
+class VersionedCache:
+    """
+    Cache wyników ważny dla jednej wersji danych (version_func), z łączeniem
+    równoczesnych obliczeń tego samego klucza. max_entries ogranicza rozmiar
+    (np. dla dużych wykresów HTML) - przy przepełnieniu usuwany jest najstarszy wpis.
+    Z per_key=True version_func(key) zwraca wersję pojedynczego wpisu (np. maszyny)
+    i unieważniane są tylko wpisy, których wersja się zmieniła.
+    """
+
+    def __init__(self, name, version_func, max_entries=None, per_key=False):
+        self.name = name
+        self.version_func = version_func
+        self.max_entries = max_entries
+        self.per_key = per_key
+        self.flight = SingleFlight(name)
+        self._lock = threading.Lock()
+        self._version = None
+        self._entries = {}
+        self.stats = {'hits': 0, 'misses': 0}
+        CACHES[name] = self
+
+    def get(self, key, compute):
+        """Zwróć wynik z cache lub oblicz go (raz dla wszystkich czekających)"""
+        if self.per_key:
+            return self._get_per_key(key, compute)
+        version = self.version_func()
+        with self._lock:
+            if version != self._version:
+                self._version = version
+                self._entries = {}
+            if key in self._entries:
+                self.stats['hits'] += 1
+                return self._entries[key]
+            self.stats['misses'] += 1
+
+        result = self.flight.do((version, key), compute)
+
+        with self._lock:
+            if version == self._version:
+                self._store(key, result)
+        return result
+
+    def _get_per_key(self, key, compute):
+        version = self.version_func(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self.stats['hits'] += 1
+                return entry[1]
+            self.stats['misses'] += 1
+
+        result = self.flight.do((version, key), compute)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self._entries.pop(key, None)
+                self._store(key, (version, result))
+        return result
+
+    def _store(self, key, value):
+        if self.max_entries and len(self._entries) >= self.max_entries:
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[key] = value
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+
+
+def reset_stats():
+    """Wyzeruj liczniki grup i cache (proces po fork - liczniki rodzica raportuje rodzic)"""
+    for group in list(FLIGHTS.values()) + list(CACHES.values()):
+        with group._lock:
+            group.stats = dict.fromkeys(group.stats, 0)
+
+
+def get_stats():
+    """Liczniki wszystkich grup single-flight i cache"""
+    return {
+        'flights': {name: dict(flight.stats) for name, flight in FLIGHTS.items()},
+        'caches': {
+            name: dict(cache.stats, entries=len(cache._entries), version=cache._version)
+            for name, cache in CACHES.items()
+        }
+    }
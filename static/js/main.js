@@ -8,7 +8,19 @@ let timerInterval = null;
 let charts = {};
 let slides = [];
 let currentSlide = 0;
-let slideInterval = null;
+let slideTimer = null;
+let slideshowRunning = false;
+// Czas wyświetlania zdjęcia; klip wideo trwa do końca, najdłużej MAX_VIDEO_SLIDE_MS
+const SLIDE_DURATION_MS = 5000;
+const MAX_VIDEO_SLIDE_MS = 120000;
+let rotationIndex = 0;
+let refreshTimeout = null;
+
+// Konfiguracja z /api/config (config.json na serwerze) - wartości domyślne do czasu pobrania
+let kioskConfig = {
+    rotation_interval: 30,   // sekundy
+    refresh_interval: 300    // sekundy
+};
 
 // ==================== INICJALIZACJA ====================
 
@@ -16,6 +28,9 @@ document.addEventListener('DOMContentLoaded', () => {
     // Inicjalizuj aplikację
     initializeApp();
     
+    // Service worker - ekran działa dalej przy restarcie serwera lub utracie Wi-Fi
+    registerServiceWorker();
+    
     // Sprawdź zapisany tryb ciemny
     if (localStorage.getItem('darkMode') === 'true') {
         document.documentElement.classList.add('dark');
@@ -33,6 +48,26 @@ document.addEventListener('DOMContentLoaded', () => {
     });
 });
 
+// ==================== TRYB OFFLINE ====================
+
+function registerServiceWorker() {
+    if (!('serviceWorker' in navigator)) return;
+    navigator.serviceWorker.register('/sw.js').catch(error => {
+        console.error('Błąd rejestracji service workera:', error);
+    });
+}
+
+// Sprawdź nową wersję zasobów (nowy worker przejmuje ekran bez przeładowania)
+async function updateServiceWorker() {
+    if (!('serviceWorker' in navigator)) return;
+    try {
+        const registration = await navigator.serviceWorker.getRegistration();
+        if (registration) await registration.update();
+    } catch (error) {
+        // Serwer niedostępny - spróbuj przy następnym odświeżeniu
+    }
+}
+
 // ==================== FUNKCJE GŁÓWNE ====================
 
 async function initializeApp() {
@@ -40,8 +75,12 @@ async function initializeApp() {
     updateCurrentTime();
     setInterval(updateCurrentTime, 1000);
     
+    // Interwały rotacji i odświeżania z serwera
+    await loadConfig();
+    
     // Załaduj dane
     await loadMachines();
+    await loadOverview();
     await loadInspirationsData();
     await loadSlidesData();
     
@@ -54,8 +93,39 @@ async function initializeApp() {
     // Ustaw pierwszą sekcję jako aktywną
     showSection('wykresy');
     
-    // Auto-refresh co 5 minut
-    setInterval(refreshContent, 5 * 60 * 1000);
+    // Auto-refresh co refresh_interval - z losowym przesunięciem, aby ekrany włączone razem
+    // (np. po zaniku prądu) nie odpytywały serwera w tej samej chwili
+    scheduleRefresh(Math.random() * 60 * 1000);
+}
+
+// Pobierz konfigurację - zwraca true, gdy zmienił się interwał rotacji
+async function loadConfig() {
+    try {
+        const response = await fetch('/api/config');
+        const config = await response.json();
+        const previousRotation = kioskConfig.rotation_interval;
+        
+        // Tylko poprawne (dodatnie) interwały nadpisują bieżące
+        ['rotation_interval', 'refresh_interval'].forEach(key => {
+            const value = Number(config[key]);
+            if (value > 0) config[key] = value; else delete config[key];
+        });
+        kioskConfig = { ...kioskConfig, ...config };
+        return kioskConfig.rotation_interval !== previousRotation;
+    } catch (error) {
+        console.error('Błąd ładowania konfiguracji:', error);
+        return false;
+    }
+}
+
+// Następne odświeżenie po refresh_interval (+ opcjonalne przesunięcie) - interwał czytany
+// przy każdym planowaniu, więc zmiana w config.json działa bez przeładowania strony
+function scheduleRefresh(extraDelay = 0) {
+    clearTimeout(refreshTimeout);
+    refreshTimeout = setTimeout(async () => {
+        await refreshContent();
+        scheduleRefresh();
+    }, kioskConfig.refresh_interval * 1000 + extraDelay);
 }
 
 function updateCurrentTime() {
@@ -114,28 +184,31 @@ function showSection(sectionName) {
 // ==================== AUTOMATYCZNA ROTACJA ====================
 
 function startAutoRotation() {
-    const sections = ['wykresy', 'inspiracje', 'zdjecia', 'o-nas'];
-    let currentIndex = 0;
+    const sections = ['wykresy', 'ranking', 'inspiracje', 'zdjecia', 'o-nas'];
+    const interval = kioskConfig.rotation_interval;
+    
+    clearInterval(rotationInterval);
+    clearInterval(timerInterval);
     
     rotationInterval = setInterval(() => {
-        currentIndex = (currentIndex + 1) % sections.length;
-        showSection(sections[currentIndex]);
-    }, 30000); // 30 sekund
+        rotationIndex = (rotationIndex + 1) % sections.length;
+        showSection(sections[rotationIndex]);
+    }, interval * 1000);
     
     // Timer wizualny
-    rotationTimer = 30;
+    rotationTimer = interval;
     timerInterval = setInterval(() => {
         rotationTimer--;
         document.getElementById('rotation-timer').textContent = rotationTimer;
         
         if (rotationTimer <= 0) {
-            rotationTimer = 30;
+            rotationTimer = interval;
         }
     }, 1000);
 }
 
 function resetRotationTimer() {
-    rotationTimer = 30;
+    rotationTimer = kioskConfig.rotation_interval;
     document.getElementById('rotation-timer').textContent = rotationTimer;
 }
 
@@ -144,6 +217,8 @@ function resetRotationTimer() {
 // Globalne zmienne dla wykresu
 let currentMachineCode = '1310';
 let currentStartDay = 1;
+// Cały miesiąc wybranej maszyny - suwak dni wycina okno lokalnie, bez zapytań do serwera
+let monthChartData = null;
 
 // Załaduj listę maszyn
 async function loadMachines() {
@@ -165,12 +240,12 @@ async function loadMachines() {
             
             // Załaduj dane dla pierwszej maszyny
             currentMachineCode = machines[0].kod;
-            loadChartData(currentMachineCode, currentStartDay);
+            loadChartData(currentMachineCode);
             
             // Dodaj listener na zmianę maszyny
             select.addEventListener('change', function() {
                 currentMachineCode = this.value;
-                loadChartData(currentMachineCode, currentStartDay);
+                loadChartData(currentMachineCode);
             });
         }
         
@@ -179,7 +254,7 @@ async function loadMachines() {
             slider.addEventListener('input', function() {
                 currentStartDay = parseInt(this.value);
                 updateDayRangeLabel(currentStartDay);
-                loadChartData(currentMachineCode, currentStartDay);
+                renderChartWindow(currentStartDay);
             });
         }
     } catch (error) {
@@ -196,21 +271,50 @@ function updateDayRangeLabel(startDay) {
     }
 }
 
-async function loadChartData(kod = '1310', startDay = 1) {
+async function loadChartData(kod = '1310') {
     try {
-        const response = await fetch(`/api/chart-data?kod=${encodeURIComponent(kod)}&start_day=${startDay}`);
+        // Cały miesiąc maszyny - przeglądarka rewaliduje go ETagiem (304 bez zmian danych)
+        const response = await fetch(`/api/chart-data?kod=${encodeURIComponent(kod)}&range=month&format=compact`);
         const data = await response.json();
         
-        // Dane w formacie {series: [...]}
-        if (data && data.series && data.series.length > 0) {
-            createCharts(data);
+        // Format kompaktowy: {days: [...], series: [{type, name, color, y: [...]}], window_days: 7}
+        if (data && data.series && data.days) {
+            monthChartData = data;
+            renderChartWindow(currentStartDay);
         }
     } catch (error) {
         console.error('Błąd ładowania danych wykresów:', error);
     }
 }
 
-function createCombinedChart(series) {
+// Wytnij okno dni [startDay, startDay + window_days - 1] z danych całego miesiąca
+// (oś dni jest posortowana - wystarczy jeden wycinek wspólny dla wszystkich serii)
+function sliceChartWindow(data, startDay) {
+    const endDay = startDay + (data.window_days || 7) - 1;
+    let from = data.days.findIndex(day => day >= startDay);
+    if (from < 0) from = data.days.length;
+    let to = from;
+    while (to < data.days.length && data.days[to] <= endDay) to++;
+    
+    const series = [];
+    data.series.forEach(s => {
+        const y = s.y.slice(from, to);
+        if (y.some(v => v !== null)) {
+            series.push({ ...s, y });
+        }
+    });
+    return { days: data.days.slice(from, to), series };
+}
+
+function renderChartWindow(startDay) {
+    if (!monthChartData) return;
+    const data = sliceChartWindow(monthChartData, startDay);
+    if (data.series.length > 0) {
+        createCharts(data);
+    }
+}
+
+function createCombinedChart(days, series) {
     const ctxProduction = document.getElementById('productionChart');
     if (!ctxProduction) return;
     
@@ -219,25 +323,18 @@ function createCombinedChart(series) {
         charts.production.destroy();
     }
     
-    // Zbierz wszystkie dni z serii
-    const allDays = new Set();
-    series.forEach(s => s.x.forEach(day => allDays.add(day)));
-    const labels = Array.from(allDays).sort((a, b) => a - b).map(d => `Dzień ${d}`);
+    // Wspólna oś dni - wartości serii są już wyrównane do niej (null - brak dnia)
+    const labels = days.map(d => `Dzień ${d}`);
     
     // Przygotuj datasety dla Chart.js
     const datasets = [];
     
     // Dodaj słupki (type: 'bar')
     series.filter(s => s.type === 'bar').forEach(s => {
-        const dataMap = {};
-        s.x.forEach((day, i) => {
-            dataMap[day] = s.y[i];
-        });
-        
         datasets.push({
             type: 'bar',
             label: s.name,
-            data: Array.from(allDays).sort((a, b) => a - b).map(day => dataMap[day] || 0),
+            data: s.y.map(v => v || 0),
             backgroundColor: s.color + 'CC',
             borderColor: s.color,
             borderWidth: 1,
@@ -247,15 +344,10 @@ function createCombinedChart(series) {
     
     // Dodaj linie (type: 'line')
     series.filter(s => s.type === 'line').forEach(s => {
-        const dataMap = {};
-        s.x.forEach((day, i) => {
-            dataMap[day] = s.y[i];
-        });
-        
         datasets.push({
             type: 'line',
             label: s.name,
-            data: Array.from(allDays).sort((a, b) => a - b).map(day => dataMap[day] || null),
+            data: s.y.map(v => v || null),
             borderColor: s.color,
             backgroundColor: s.color + '33',
             borderWidth: 2,
@@ -328,9 +420,9 @@ function createCombinedChart(series) {
 }
 
 function createCharts(data) {
-    // Sprawdź czy dane mają format z seriami (nowy format)
-    if (data.series && Array.isArray(data.series)) {
-        createCombinedChart(data.series);
+    // Sprawdź czy dane mają format kompaktowy z seriami na wspólnej osi dni
+    if (data.series && Array.isArray(data.series) && data.days) {
+        createCombinedChart(data.days, data.series);
     }
     
     const innovationData = [5, 7, 6, 8, 10, 9, 11]; // Przykładowe
@@ -415,6 +507,64 @@ function createCharts(data) {
     }
 }
 
+// ==================== RANKING MASZYN ====================
+
+async function loadOverview() {
+    try {
+        const response = await fetch('/api/overview');
+        const overview = await response.json();
+        
+        displayOverview(overview);
+    } catch (error) {
+        console.error('Błąd ładowania rankingu maszyn:', error);
+    }
+}
+
+function displayOverview(overview) {
+    const head = document.getElementById('overview-head');
+    const body = document.getElementById('overview-body');
+    if (!head || !body) return;
+    
+    const format = value => value === null ? '–' : Math.round(value).toLocaleString('pl-PL');
+    const rank = value => value === null ? '' : `<span class="text-sm text-orange-500 font-bold ml-2">#${value}</span>`;
+    
+    // Kody, nazwy i brygady pochodzą z Export.xlsx / importu - wstawiane przez textContent
+    head.innerHTML = `
+        <tr>
+            <th class="py-3 pr-4">#</th>
+            <th class="py-3 pr-4">Maszyna</th>
+            ${overview.brigades.map(() => `<th class="py-3 pr-4 text-right"></th>`).join('')}
+            <th class="py-3 text-right">Razem</th>
+        </tr>
+    `;
+    head.querySelectorAll('th.text-right').forEach((th, i) => {
+        if (i < overview.brigades.length) th.textContent = `Brygada ${overview.brigades[i]}`;
+    });
+    
+    body.innerHTML = '';
+    overview.machines.forEach(machine => {
+        const row = document.createElement('tr');
+        row.className = 'border-b border-gray-100 dark:border-gray-700';
+        const label = machine.nazwa ? `${machine.kod} - ${machine.nazwa}` : machine.kod;
+        row.innerHTML = `
+            <td class="py-3 pr-4 font-bold text-orange-500">${machine.rank ?? ''}</td>
+            <td class="py-3 pr-4"></td>
+            ${overview.brigades.map(b => {
+                const brigade = machine.brigades[b];
+                return `<td class="py-3 pr-4 text-right">${format(brigade.days ? brigade.total : null)}${rank(brigade.rank)}</td>`;
+            }).join('')}
+            <td class="py-3 text-right font-bold">${format(machine.total)}</td>
+        `;
+        row.cells[1].textContent = label;
+        body.appendChild(row);
+    });
+    
+    const lastDay = document.getElementById('overview-last-day');
+    if (lastDay) {
+        lastDay.textContent = overview.last_day ? `Dane do dnia ${overview.last_day}` : 'Brak danych';
+    }
+}
+
 // ==================== INSPIRACJE ====================
 
 async function loadInspirationsData() {
@@ -492,31 +642,65 @@ function startSlideshow() {
     if (slides.length === 0) return;
     
     currentSlide = 0;
+    slideshowRunning = true;
     showSlide(currentSlide);
-    
-    slideInterval = setInterval(() => {
-        currentSlide = (currentSlide + 1) % slides.length;
-        showSlide(currentSlide);
-    }, 5000); // Zmiana co 5 sekund
 }
 
 function stopSlideshow() {
-    if (slideInterval) {
-        clearInterval(slideInterval);
-        slideInterval = null;
+    slideshowRunning = false;
+    clearTimeout(slideTimer);
+    slideTimer = null;
+    const video = document.getElementById('slideshow-video');
+    if (video) video.pause();
+}
+
+function nextSlide() {
+    currentSlide = (currentSlide + 1) % slides.length;
+    showSlide(currentSlide);
+}
+
+function scheduleNextSlide(delay) {
+    clearTimeout(slideTimer);
+    if (slideshowRunning) {
+        slideTimer = setTimeout(nextSlide, delay);
     }
 }
 
 function showSlide(index) {
     const img = document.getElementById('slideshow-image');
-    if (!img || !slides[index]) return;
+    const video = document.getElementById('slideshow-video');
+    const slide = slides[index];
+    if (!img || !slide) return;
     
     // Fade out
+    clearTimeout(slideTimer);
     img.style.opacity = '0';
+    if (video) video.style.opacity = '0';
     
     setTimeout(() => {
-        img.src = slides[index].url;
-        img.style.opacity = '1';
+        if (slide.type === 'video' && video) {
+            // Przeglądarka pobiera klip fragmentami (Range) - start bez ściągania całego pliku
+            img.classList.add('hidden');
+            video.classList.remove('hidden');
+            video.poster = slide.poster || '';
+            video.src = slide.url;
+            video.style.opacity = '1';
+            video.onended = () => scheduleNextSlide(0);
+            video.play().catch(() => scheduleNextSlide(SLIDE_DURATION_MS));
+            scheduleNextSlide(MAX_VIDEO_SLIDE_MS);
+        } else {
+            if (video) {
+                video.onended = null;
+                video.pause();
+                video.removeAttribute('src');
+                video.load();
+                video.classList.add('hidden');
+            }
+            img.classList.remove('hidden');
+            img.src = slide.url;
+            img.style.opacity = '1';
+            scheduleNextSlide(SLIDE_DURATION_MS);
+        }
         
         // Aktualizuj kropki
         document.querySelectorAll('.slide-dot').forEach((dot, i) => {
@@ -528,8 +712,8 @@ function showSlide(index) {
 function goToSlide(index) {
     stopSlideshow();
     currentSlide = index;
+    slideshowRunning = true;
     showSlide(currentSlide);
-    startSlideshow();
 }
 
 // ==================== TRYB CIEMNY ====================
@@ -582,15 +766,22 @@ async function loadContent() {
 async function refreshContent() {
     console.log('🔄 Automatyczne odświeżanie treści...');
     
+    // Nowy interwał rotacji z config.json - uruchom rotację ponownie
+    if (await loadConfig()) {
+        startAutoRotation();
+    }
+    
     // Przeładuj dane dla aktualnie wybranej maszyny
     const select = document.getElementById('machine-select');
     if (select && select.value) {
         await loadChartData(select.value);
     }
     
+    await loadOverview();
     await loadInspirationsData();
     await loadSlidesData();
     await loadContent();
+    await updateServiceWorker();
 }
 
 // ==================== EKSPORTOWANE FUNKCJE ====================
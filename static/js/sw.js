@@ -0,0 +1,106 @@
+// Firmowy Kiosk - Service Worker (praca offline)
+// Serwowany przez /sw.js - serwer wstawia wersję manifestu, więc każda zmiana zasobów
+// (strona, main.js, style, slajdy) instaluje nowego workera bez przeładowania ekranów.
+
+const MANIFEST_VERSION = '__MANIFEST_VERSION__';
+const CACHE_PREFIX = 'kiosk-';
+const CACHE_NAME = CACHE_PREFIX + MANIFEST_VERSION;
+
+// Ścieżki, których worker nie obsługuje (panel admina, strumienie, diagnostyka)
+const BYPASS_PREFIXES = [
+    '/admin', '/sw.js', '/asset-manifest.json', '/metrics',
+    '/api/events', '/api/poll', '/api/export', '/api/debug', '/api/ready',
+    '/api/ingest-report'
+];
+
+// ==================== INSTALACJA ====================
+
+self.addEventListener('install', event => {
+    event.waitUntil(precache().then(() => self.skipWaiting()));
+});
+
+async function precache() {
+    const response = await fetch('/asset-manifest.json', { cache: 'no-store' });
+    const manifest = await response.json();
+    const cache = await caches.open(CACHE_NAME);
+    const urls = [...manifest.shell, ...manifest.slides, ...manifest.api];
+
+    // Pojedynczy brakujący zasób nie blokuje instalacji; obrazy z poprzedniej wersji
+    // kopiowane są z cache zamiast ponownego pobierania
+    await Promise.allSettled(urls.map(async url => {
+        const previous = manifest.slides.includes(url) ? await caches.match(url) : undefined;
+        if (previous) {
+            await cache.put(url, previous);
+        } else {
+            await cache.add(new Request(url, { cache: 'no-cache' }));
+        }
+    }));
+}
+
+self.addEventListener('activate', event => {
+    event.waitUntil((async () => {
+        const names = await caches.keys();
+        await Promise.all(names
+            .filter(name => name.startsWith(CACHE_PREFIX) && name !== CACHE_NAME)
+            .map(name => caches.delete(name)));
+        await self.clients.claim();
+    })());
+});
+
+// ==================== OBSŁUGA ZAPYTAŃ ====================
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET') return;
+
+    // Wideo pobierane fragmentami (Range, 206) - obsługuje przeglądarka i jej cache HTTP
+    if (request.headers.has('range') || request.destination === 'video') return;
+
+    const url = new URL(request.url);
+    if (url.origin === self.location.origin) {
+        if (BYPASS_PREFIXES.some(prefix => url.pathname.startsWith(prefix))) return;
+        if (url.searchParams.has('profile')) return;
+    }
+
+    // Dane API: sieć, a przy braku połączenia ostatnia zapisana odpowiedź.
+    // Powłoka (strona, skrypty, style, obrazy, biblioteki CDN): stale-while-revalidate.
+    if (url.origin === self.location.origin && url.pathname.startsWith('/api/')) {
+        event.respondWith(networkFirst(request));
+    } else {
+        event.respondWith(staleWhileRevalidate(event, request));
+    }
+});
+
+async function networkFirst(request) {
+    const cache = await caches.open(CACHE_NAME);
+    try {
+        const response = await fetch(request);
+        if (response.ok) {
+            await cache.put(request, response.clone());
+        }
+        return response;
+    } catch (error) {
+        const cached = await cache.match(request);
+        if (cached) return cached;
+        throw error;
+    }
+}
+
+async function staleWhileRevalidate(event, request) {
+    const cache = await caches.open(CACHE_NAME);
+    const cached = await cache.match(request);
+    const update = fetch(request).then(async response => {
+        // Odpowiedzi cross-origin (CDN) są nieprzezroczyste (status 0) - też je zapisuj
+        if (response.ok || response.type === 'opaque') {
+            await cache.put(request, response.clone());
+        }
+        return response;
+    });
+
+    if (cached) {
+        // Odśwież w tle - błąd sieci nie przerywa pracy ekranu
+        event.waitUntil(update.catch(() => undefined));
+        return cached;
+    }
+    return update;
+}